@@ -4,10 +4,12 @@ Async SQLite operations using aiosqlite
 """
 
 import aiosqlite
+import asyncio
 import json
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, FrozenSet, Tuple
 from contextlib import asynccontextmanager
 
 from api.models import (
@@ -15,10 +17,146 @@ from api.models import (
     Vulnerability, Port, SystemState, ScanStatus, Severity
 )
 
+# Schema DDL, applied in a single executescript round-trip
+SCHEMA_SQL = """
+-- Targets table
+CREATE TABLE IF NOT EXISTS targets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    primary_domain TEXT NOT NULL,
+    scope TEXT DEFAULT '[]',
+    exclusions TEXT DEFAULT '[]',
+    asn_list TEXT DEFAULT '[]',
+    ip_ranges TEXT DEFAULT '[]',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT 'pending'
+);
+
+-- Scans table
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    target_id TEXT NOT NULL,
+    name TEXT,
+    profile TEXT DEFAULT 'normal',
+    status TEXT DEFAULT 'pending',
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    progress TEXT DEFAULT '{}',
+    current_task TEXT,
+    config TEXT DEFAULT '{}',
+    error_message TEXT,
+    checkpoint_data TEXT,
+    is_resumed BOOLEAN DEFAULT 0,
+    llm_model_used TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (target_id) REFERENCES targets(id)
+);
+
+-- Subdomains table
+CREATE TABLE IF NOT EXISTS subdomains (
+    id TEXT PRIMARY KEY,
+    scan_id TEXT NOT NULL,
+    subdomain TEXT NOT NULL,
+    ip_addresses TEXT DEFAULT '[]',
+    status_code INTEGER,
+    title TEXT,
+    tech_stack TEXT DEFAULT '[]',
+    is_live BOOLEAN DEFAULT 0,
+    screenshot_path TEXT,
+    headers TEXT,
+    tls_info TEXT,
+    source TEXT DEFAULT '[]',
+    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (scan_id) REFERENCES scans(id)
+);
+
+-- Endpoints table
+CREATE TABLE IF NOT EXISTS endpoints (
+    id TEXT PRIMARY KEY,
+    scan_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    method TEXT DEFAULT 'GET',
+    status_code INTEGER,
+    content_type TEXT,
+    content_length INTEGER,
+    parameters TEXT DEFAULT '[]',
+    gf_patterns TEXT DEFAULT '[]',
+    response_hash TEXT,
+    discovered_via TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (scan_id) REFERENCES scans(id)
+);
+
+-- Vulnerabilities table
+CREATE TABLE IF NOT EXISTS vulnerabilities (
+    id TEXT PRIMARY KEY,
+    scan_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    cvss_score REAL,
+    description TEXT,
+    affected_url TEXT,
+    parameter TEXT,
+    evidence TEXT,
+    poc_commands TEXT DEFAULT '[]',
+    remediation TEXT,
+    tool_source TEXT,
+    template_id TEXT,
+    false_positive BOOLEAN DEFAULT 0,
+    llm_analysis TEXT,
+    llm_model TEXT,
+    reported BOOLEAN DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (scan_id) REFERENCES scans(id)
+);
+
+-- Ports table
+CREATE TABLE IF NOT EXISTS ports (
+    id TEXT PRIMARY KEY,
+    scan_id TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    protocol TEXT DEFAULT 'tcp',
+    service TEXT,
+    version TEXT,
+    banner TEXT,
+    state TEXT DEFAULT 'open',
+    FOREIGN KEY (scan_id) REFERENCES scans(id)
+);
+
+-- System state table
+CREATE TABLE IF NOT EXISTS system_state (
+    id TEXT PRIMARY KEY,
+    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    network_status TEXT DEFAULT 'online',
+    tunnel_url TEXT,
+    tunnel_service TEXT,
+    battery_level INTEGER,
+    is_charging BOOLEAN DEFAULT 0,
+    temperature REAL,
+    llm_status TEXT DEFAULT 'unloaded',
+    free_memory_mb INTEGER,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Certificate transparency response cache
+CREATE TABLE IF NOT EXISTS ct_cache (
+    domain TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    certificates INTEGER DEFAULT 0,
+    names TEXT DEFAULT '[]',
+    PRIMARY KEY (domain, source)
+);
+"""
+
 class DatabaseManager:
     def __init__(self, db_path: str = "data/recon.db"):
         self.db_path = db_path
         self._connection: Optional[aiosqlite.Connection] = None
+        # All writes share one connection, so only one transaction may be open at a time
+        self._write_lock = asyncio.Lock()
     
     async def connect(self):
         """Initialize database connection and create tables"""
@@ -28,6 +166,13 @@ class DatabaseManager:
         self._connection = await aiosqlite.connect(self.db_path)
         self._connection.row_factory = aiosqlite.Row
         
+        # WAL lets readers proceed during writes; NORMAL sync is safe under WAL
+        await self._connection.execute("PRAGMA journal_mode=WAL")
+        await self._connection.execute("PRAGMA synchronous=NORMAL")
+        await self._connection.execute("PRAGMA busy_timeout=5000")
+        await self._connection.execute("PRAGMA cache_size=-16384")
+        await self._connection.execute("PRAGMA temp_store=MEMORY")
+        
         # Create tables
         await self._create_tables()
         return self
@@ -38,211 +183,92 @@ class DatabaseManager:
             await self._connection.close()
             self._connection = None
     
+    @asynccontextmanager
+    async def transaction(self):
+        """Group several writes into one IMMEDIATE transaction and commit"""
+        async with self._write_lock:
+            await self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._connection
+            except BaseException:
+                # Also on cancellation, so the connection is never left mid-transaction
+                await self._connection.rollback()
+                raise
+            else:
+                await self._connection.commit()
+    
     async def _create_tables(self):
         """Create all tables if they don't exist"""
-        # Target table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS targets (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                primary_domain TEXT NOT NULL,
-                scope TEXT DEFAULT '[]',
-                exclusions TEXT DEFAULT '[]',
-                asn_list TEXT DEFAULT '[]',
-                ip_ranges TEXT DEFAULT '[]',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'pending'
-            )
-        """)
-        
-        # Scan table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS scans (
-                id TEXT PRIMARY KEY,
-                target_id TEXT NOT NULL,
-                name TEXT,
-                profile TEXT DEFAULT 'normal',
-                status TEXT DEFAULT 'pending',
-                started_at TIMESTAMP,
-                completed_at TIMESTAMP,
-                progress TEXT DEFAULT '{}',
-                current_task TEXT,
-                config TEXT DEFAULT '{}',
-                error_message TEXT,
-                checkpoint_data TEXT,
-                is_resumed BOOLEAN DEFAULT 0,
-                llm_model_used TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (target_id) REFERENCES targets(id)
-            )
-        """)
-        
-        # Subdomain table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS subdomains (
-                id TEXT PRIMARY KEY,
-                scan_id TEXT NOT NULL,
-                subdomain TEXT NOT NULL,
-                ip_addresses TEXT DEFAULT '[]',
-                status_code INTEGER,
-                title TEXT,
-                tech_stack TEXT DEFAULT '[]',
-                is_live BOOLEAN DEFAULT 0,
-                screenshot_path TEXT,
-                headers TEXT,
-                tls_info TEXT,
-                source TEXT DEFAULT '[]',
-                first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (scan_id) REFERENCES scans(id)
-            )
-        """)
-        
-        # Endpoint table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS endpoints (
-                id TEXT PRIMARY KEY,
-                scan_id TEXT NOT NULL,
-                url TEXT NOT NULL,
-                method TEXT DEFAULT 'GET',
-                status_code INTEGER,
-                content_type TEXT,
-                content_length INTEGER,
-                parameters TEXT DEFAULT '[]',
-                gf_patterns TEXT DEFAULT '[]',
-                response_hash TEXT,
-                discovered_via TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (scan_id) REFERENCES scans(id)
-            )
-        """)
-        
-        # Vulnerability table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS vulnerabilities (
-                id TEXT PRIMARY KEY,
-                scan_id TEXT NOT NULL,
-                title TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                cvss_score REAL,
-                description TEXT,
-                affected_url TEXT,
-                parameter TEXT,
-                evidence TEXT,
-                poc_commands TEXT DEFAULT '[]',
-                remediation TEXT,
-                tool_source TEXT,
-                template_id TEXT,
-                false_positive BOOLEAN DEFAULT 0,
-                llm_analysis TEXT,
-                llm_model TEXT,
-                reported BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (scan_id) REFERENCES scans(id)
-            )
-        """)
-        
-        # Port table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS ports (
-                id TEXT PRIMARY KEY,
-                scan_id TEXT NOT NULL,
-                ip TEXT NOT NULL,
-                port INTEGER NOT NULL,
-                protocol TEXT DEFAULT 'tcp',
-                service TEXT,
-                version TEXT,
-                banner TEXT,
-                state TEXT DEFAULT 'open',
-                FOREIGN KEY (scan_id) REFERENCES scans(id)
-            )
-        """)
-        
-        # System state table
-        await self._connection.execute("""
-            CREATE TABLE IF NOT EXISTS system_state (
-                id TEXT PRIMARY KEY,
-                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                network_status TEXT DEFAULT 'online',
-                tunnel_url TEXT,
-                tunnel_service TEXT,
-                battery_level INTEGER,
-                is_charging BOOLEAN DEFAULT 0,
-                temperature REAL,
-                llm_status TEXT DEFAULT 'unloaded',
-                free_memory_mb INTEGER,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        await self._connection.commit()
+        async with self._write_lock:
+            await self._connection.executescript(SCHEMA_SQL)
+            await self._connection.commit()
     
     # Target operations
     async def create_target(self, target_data: Dict[str, Any]) -> str:
         """Create a new target"""
         target_id = target_data.get('id')
-        await self._connection.execute("""
-            INSERT INTO targets (id, name, primary_domain, scope, exclusions, asn_list, ip_ranges, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            target_id,
-            target_data['name'],
-            target_data['primary_domain'],
-            json.dumps(target_data.get('scope', [])),
-            json.dumps(target_data.get('exclusions', [])),
-            json.dumps(target_data.get('asn_list', [])),
-            json.dumps(target_data.get('ip_ranges', [])),
-            target_data.get('status', 'pending')
-        ))
-        await self._connection.commit()
+        async with self.transaction() as conn:
+            await conn.execute("""
+                INSERT INTO targets (id, name, primary_domain, scope, exclusions, asn_list, ip_ranges, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                target_id,
+                target_data['name'],
+                target_data['primary_domain'],
+                json.dumps(target_data.get('scope', [])),
+                json.dumps(target_data.get('exclusions', [])),
+                json.dumps(target_data.get('asn_list', [])),
+                json.dumps(target_data.get('ip_ranges', [])),
+                target_data.get('status', 'pending')
+            ))
         return target_id
     
     async def get_target(self, target_id: str) -> Optional[Dict]:
         """Get target by ID"""
-        async with self._connection.execute(
+        rows = await self._connection.execute_fetchall(
             "SELECT * FROM targets WHERE id = ?", (target_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return None
+        )
+        return dict(rows[0]) if rows else None
+    
+    async def get_target_domain(self, target_id: str) -> Optional[str]:
+        """Get only the primary domain of a target"""
+        rows = await self._connection.execute_fetchall(
+            "SELECT primary_domain FROM targets WHERE id = ? LIMIT 1", (target_id,)
+        )
+        return rows[0][0] if rows else None
     
     async def get_all_targets(self) -> List[Dict]:
         """Get all targets"""
-        async with self._connection.execute(
+        rows = await self._connection.execute_fetchall(
             "SELECT * FROM targets ORDER BY created_at DESC"
-        ) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        )
+        return [dict(row) for row in rows]
     
     # Scan operations
     async def create_scan(self, scan_data: Dict[str, Any]) -> str:
         """Create a new scan"""
         scan_id = scan_data.get('id')
-        await self._connection.execute("""
-            INSERT INTO scans (id, target_id, name, profile, status, config, is_resumed)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            scan_id,
-            scan_data['target_id'],
-            scan_data.get('name', f"Scan {datetime.now().isoformat()}"),
-            scan_data.get('profile', 'normal'),
-            scan_data.get('status', 'pending'),
-            json.dumps(scan_data.get('config', {})),
-            scan_data.get('is_resumed', False)
-        ))
-        await self._connection.commit()
+        async with self.transaction() as conn:
+            await conn.execute("""
+                INSERT INTO scans (id, target_id, name, profile, status, config, is_resumed)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (
+                scan_id,
+                scan_data['target_id'],
+                scan_data.get('name', f"Scan {datetime.now().isoformat()}"),
+                scan_data.get('profile', 'normal'),
+                scan_data.get('status', 'pending'),
+                json.dumps(scan_data.get('config', {})),
+                scan_data.get('is_resumed', False)
+            ))
         return scan_id
     
     async def get_scan(self, scan_id: str) -> Optional[Dict]:
         """Get scan by ID"""
-        async with self._connection.execute(
+        rows = await self._connection.execute_fetchall(
             "SELECT * FROM scans WHERE id = ?", (scan_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return None
+        )
+        return dict(rows[0]) if rows else None
     
     async def update_scan_status(self, scan_id: str, status: str, 
                                   current_task: Optional[str] = None,
@@ -267,41 +293,42 @@ class DatabaseManager:
         params.append(scan_id)
         
         query = f"UPDATE scans SET {', '.join(updates)} WHERE id = ?"
-        await self._connection.execute(query, params)
-        await self._connection.commit()
+        async with self.transaction() as conn:
+            await conn.execute(query, params)
     
     async def _is_scan_started(self, scan_id: str) -> bool:
         """Check if scan has started_at timestamp"""
-        async with self._connection.execute(
+        rows = await self._connection.execute_fetchall(
             "SELECT started_at FROM scans WHERE id = ?", (scan_id,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            return row and row['started_at'] is not None
+        )
+        return bool(rows) and rows[0]['started_at'] is not None
     
     async def save_checkpoint(self, scan_id: str, checkpoint_data: Dict):
         """Save scan checkpoint for resume capability"""
-        await self._connection.execute("""
-            UPDATE scans SET checkpoint_data = ? WHERE id = ?
-        """, (json.dumps(checkpoint_data), scan_id))
-        await self._connection.commit()
+        async with self.transaction() as conn:
+            await conn.execute("""
+                UPDATE scans SET checkpoint_data = ? WHERE id = ?
+            """, (json.dumps(checkpoint_data), scan_id))
     
     async def get_active_scans(self) -> List[Dict]:
         """Get all running or paused scans"""
-        async with self._connection.execute("""
+        rows = await self._connection.execute_fetchall("""
             SELECT * FROM scans WHERE status IN ('running', 'paused')
-        """) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        """)
+        return [dict(row) for row in rows]
     
     # Subdomain operations
-    async def add_subdomain(self, scan_id: str, subdomain_data: Dict):
-        """Add a subdomain result"""
-        await self._connection.execute("""
-            INSERT INTO subdomains 
-            (id, scan_id, subdomain, ip_addresses, status_code, title, tech_stack, 
-             is_live, screenshot_path, headers, tls_info, source)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    _SUBDOMAIN_INSERT = """
+        INSERT INTO subdomains 
+        (id, scan_id, subdomain, ip_addresses, status_code, title, tech_stack, 
+         is_live, screenshot_path, headers, tls_info, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    @staticmethod
+    def _subdomain_params(scan_id: str, subdomain_data: Dict) -> tuple:
+        """Build the INSERT parameters for a subdomain"""
+        return (
             subdomain_data.get('id'),
             scan_id,
             subdomain_data['subdomain'],
@@ -314,27 +341,52 @@ class DatabaseManager:
             json.dumps(subdomain_data.get('headers')) if subdomain_data.get('headers') else None,
             json.dumps(subdomain_data.get('tls_info')) if subdomain_data.get('tls_info') else None,
             json.dumps(subdomain_data.get('source', []))
-        ))
-        await self._connection.commit()
+        )
+    
+    async def add_subdomain(self, scan_id: str, subdomain_data: Dict):
+        """Add a subdomain result"""
+        async with self.transaction() as conn:
+            await conn.execute(
+                self._SUBDOMAIN_INSERT, self._subdomain_params(scan_id, subdomain_data)
+            )
+    
+    async def add_subdomains(self, scan_id: str, subdomains: List[Dict]):
+        """Add many subdomain results in one transaction"""
+        if not subdomains:
+            return
+        async with self.transaction() as conn:
+            await conn.executemany(
+                self._SUBDOMAIN_INSERT,
+                [self._subdomain_params(scan_id, s) for s in subdomains]
+            )
     
     async def get_subdomains(self, scan_id: str) -> List[Dict]:
         """Get all subdomains for a scan"""
-        async with self._connection.execute("""
+        rows = await self._connection.execute_fetchall("""
             SELECT * FROM subdomains WHERE scan_id = ? ORDER BY subdomain
-        """, (scan_id,)) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        """, (scan_id,))
+        return [dict(row) for row in rows]
+    
+    async def get_subdomain_names(self, scan_id: str) -> FrozenSet[str]:
+        """Get the set of subdomain names found by a scan"""
+        rows = await self._connection.execute_fetchall(
+            "SELECT subdomain FROM subdomains WHERE scan_id = ?", (scan_id,)
+        )
+        return frozenset(row[0] for row in rows)
     
     # Vulnerability operations
-    async def add_vulnerability(self, scan_id: str, vuln_data: Dict):
-        """Add a vulnerability finding"""
-        await self._connection.execute("""
-            INSERT INTO vulnerabilities
-            (id, scan_id, title, severity, cvss_score, description, affected_url,
-             parameter, evidence, poc_commands, remediation, tool_source, template_id,
-             false_positive, llm_analysis, llm_model)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    _VULN_INSERT = """
+        INSERT INTO vulnerabilities
+        (id, scan_id, title, severity, cvss_score, description, affected_url,
+         parameter, evidence, poc_commands, remediation, tool_source, template_id,
+         false_positive, llm_analysis, llm_model)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    @staticmethod
+    def _vuln_params(scan_id: str, vuln_data: Dict) -> tuple:
+        """Build the INSERT parameters for a vulnerability"""
+        return (
             vuln_data.get('id'),
             scan_id,
             vuln_data['title'],
@@ -351,8 +403,22 @@ class DatabaseManager:
             vuln_data.get('false_positive', False),
             vuln_data.get('llm_analysis'),
             vuln_data.get('llm_model')
-        ))
-        await self._connection.commit()
+        )
+    
+    async def add_vulnerability(self, scan_id: str, vuln_data: Dict):
+        """Add a vulnerability finding"""
+        async with self.transaction() as conn:
+            await conn.execute(self._VULN_INSERT, self._vuln_params(scan_id, vuln_data))
+    
+    async def add_vulnerabilities(self, scan_id: str, vulns: List[Dict]):
+        """Add many vulnerability findings in one transaction"""
+        if not vulns:
+            return
+        async with self.transaction() as conn:
+            await conn.executemany(
+                self._VULN_INSERT,
+                [self._vuln_params(scan_id, v) for v in vulns]
+            )
     
     async def get_vulnerabilities(self, scan_id: str, 
                                    severity: Optional[str] = None) -> List[Dict]:
@@ -371,73 +437,89 @@ class DatabaseManager:
                  "WHEN 'low' THEN 4 " \
                  "ELSE 5 END, created_at DESC"
         
-        async with self._connection.execute(query, params) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+        rows = await self._connection.execute_fetchall(query, params)
+        return [dict(row) for row in rows]
+    
+    # Certificate transparency cache operations
+    async def get_ct_cache(self, domain: str, source: str,
+                           max_age: int) -> Optional[Tuple[int, List[str]]]:
+        """Get cached CT names for a domain if fetched within max_age seconds"""
+        rows = await self._connection.execute_fetchall("""
+            SELECT certificates, names FROM ct_cache
+            WHERE domain = ? AND source = ? AND fetched_at > ?
+        """, (domain, source, int(time.time()) - max_age))
+        if not rows:
+            return None
+        return rows[0]['certificates'], json.loads(rows[0]['names'])
+    
+    async def set_ct_cache(self, domain: str, source: str,
+                           certificates: int, names: List[str]):
+        """Store CT names for a domain"""
+        async with self.transaction() as conn:
+            await conn.execute("""
+                INSERT OR REPLACE INTO ct_cache (domain, source, fetched_at, certificates, names)
+                VALUES (?, ?, ?, ?, ?)
+            """, (domain, source, int(time.time()), certificates, json.dumps(names)))
     
     # System state operations
     async def update_system_state(self, state_data: Dict):
         """Update system state"""
-        # Check if record exists
-        async with self._connection.execute(
-            "SELECT id FROM system_state LIMIT 1"
-        ) as cursor:
-            existing = await cursor.fetchone()
-        
-        if existing:
-            await self._connection.execute("""
-                UPDATE system_state SET
-                last_seen = CURRENT_TIMESTAMP,
-                network_status = ?,
-                tunnel_url = ?,
-                tunnel_service = ?,
-                battery_level = ?,
-                is_charging = ?,
-                temperature = ?,
-                llm_status = ?,
-                free_memory_mb = ?,
-                updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                state_data.get('network_status', 'online'),
-                state_data.get('tunnel_url'),
-                state_data.get('tunnel_service'),
-                state_data.get('battery_level'),
-                state_data.get('is_charging', False),
-                state_data.get('temperature'),
-                state_data.get('llm_status', 'unloaded'),
-                state_data.get('free_memory_mb'),
-                existing['id']
-            ))
-        else:
-            await self._connection.execute("""
-                INSERT INTO system_state 
-                (id, network_status, tunnel_url, tunnel_service, battery_level,
-                 is_charging, temperature, llm_status, free_memory_mb)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                state_data.get('id'),
-                state_data.get('network_status', 'online'),
-                state_data.get('tunnel_url'),
-                state_data.get('tunnel_service'),
-                state_data.get('battery_level'),
-                state_data.get('is_charging', False),
-                state_data.get('temperature'),
-                state_data.get('llm_status', 'unloaded'),
-                state_data.get('free_memory_mb')
-            ))
-        
-        await self._connection.commit()
+        async with self.transaction() as conn:
+            # Check if record exists
+            rows = await conn.execute_fetchall(
+                "SELECT id FROM system_state LIMIT 1"
+            )
+            existing = rows[0] if rows else None
+            
+            if existing:
+                await conn.execute("""
+                    UPDATE system_state SET
+                    last_seen = CURRENT_TIMESTAMP,
+                    network_status = ?,
+                    tunnel_url = ?,
+                    tunnel_service = ?,
+                    battery_level = ?,
+                    is_charging = ?,
+                    temperature = ?,
+                    llm_status = ?,
+                    free_memory_mb = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (
+                    state_data.get('network_status', 'online'),
+                    state_data.get('tunnel_url'),
+                    state_data.get('tunnel_service'),
+                    state_data.get('battery_level'),
+                    state_data.get('is_charging', False),
+                    state_data.get('temperature'),
+                    state_data.get('llm_status', 'unloaded'),
+                    state_data.get('free_memory_mb'),
+                    existing['id']
+                ))
+            else:
+                await conn.execute("""
+                    INSERT INTO system_state 
+                    (id, network_status, tunnel_url, tunnel_service, battery_level,
+                     is_charging, temperature, llm_status, free_memory_mb)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    state_data.get('id'),
+                    state_data.get('network_status', 'online'),
+                    state_data.get('tunnel_url'),
+                    state_data.get('tunnel_service'),
+                    state_data.get('battery_level'),
+                    state_data.get('is_charging', False),
+                    state_data.get('temperature'),
+                    state_data.get('llm_status', 'unloaded'),
+                    state_data.get('free_memory_mb')
+                ))
     
     async def get_system_state(self) -> Optional[Dict]:
         """Get current system state"""
-        async with self._connection.execute(
+        rows = await self._connection.execute_fetchall(
             "SELECT * FROM system_state ORDER BY updated_at DESC LIMIT 1"
-        ) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                return dict(row)
-            return None
+        )
+        return dict(rows[0]) if rows else None
 
 # Global database instance
 db = DatabaseManager()
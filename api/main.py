@@ -21,6 +21,7 @@ from api.resilience_manager import ResilienceManager
 from api.tunnel_manager import TunnelManager
 from api.llm_integration import LLMManager
 from api.notifications import NotificationManager
+from core.http_client import close_session
 
 # Configure logging
 logging.basicConfig(
@@ -72,6 +73,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Shutting down ReconX API...")
+    await close_session()
     await db.disconnect()
     logger.info("✅ Database disconnected")
 
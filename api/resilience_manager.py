@@ -11,6 +11,7 @@ from typing import Optional
 
 from api.database import DatabaseManager
 from api.tasks import TaskQueue
+from api.utils.termux_helpers import TermuxHelper
 
 logger = logging.getLogger(__name__)
 
@@ -133,21 +134,8 @@ class ResilienceManager:
     
     async def check_battery(self) -> Optional[int]:
         """Check battery level (Termux specific)"""
-        try:
-            # Try Termux API
-            result = subprocess.run(
-                ["termux-battery-status"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                import json
-                data = json.loads(result.stdout)
-                return data.get("percentage")
-        except Exception:
-            pass
-        return None
+        status = await TermuxHelper.get_battery_status()
+        return status.get("percentage")
     
     async def check_temperature(self) -> Optional[float]:
         """Check device temperature"""
@@ -19,6 +19,10 @@ class TunnelInfo:
     process: Optional[asyncio.subprocess.Process] = None
 
 class TunnelManager:
+    # Public URL printed by each tunnel client, compiled once
+    CLOUDFLARE_URL_PATTERN = re.compile(r'https://[a-zA-Z0-9-]+\.trycloudflare\.com')
+    LOCALTUNNEL_URL_PATTERN = re.compile(r'https://[a-zA-Z0-9-]+\.loca\.lt')
+    
     def __init__(self):
         self.current_tunnel: Optional[TunnelInfo] = None
         self._preferred_service = "cloudflare"  # cloudflare | ngrok | localtunnel
@@ -101,8 +105,6 @@ class TunnelManager:
     async def _extract_cloudflare_url(self, proc: asyncio.subprocess.Process, 
                                        timeout: int = 30) -> str:
         """Extract tunnel URL from cloudflared output"""
-        pattern = r'https://[a-zA-Z0-9-]+\.trycloudflare\.com'
-        
         try:
             while True:
                 line = await asyncio.wait_for(
@@ -111,7 +113,7 @@ class TunnelManager:
                 )
                 line = line.decode('utf-8', errors='ignore')
                 
-                match = re.search(pattern, line)
+                match = self.CLOUDFLARE_URL_PATTERN.search(line)
                 if match:
                     return match.group(0)
                 
@@ -187,8 +189,6 @@ class TunnelManager:
     async def _extract_localtunnel_url(self, proc: asyncio.subprocess.Process,
                                         timeout: int = 30) -> str:
         """Extract URL from localtunnel output"""
-        pattern = r'https://[a-zA-Z0-9-]+\.loca\.lt'
-        
         try:
             while True:
                 line = await asyncio.wait_for(
@@ -197,7 +197,7 @@ class TunnelManager:
                 )
                 line = line.decode('utf-8', errors='ignore')
                 
-                match = re.search(pattern, line)
+                match = self.LOCALTUNNEL_URL_PATTERN.search(line)
                 if match:
                     return match.group(0)
                     
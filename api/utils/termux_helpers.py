@@ -4,6 +4,8 @@ Utilities specific to Termux environment
 """
 
 import os
+import json
+import time
 import subprocess
 import logging
 from pathlib import Path
@@ -16,6 +18,10 @@ class TermuxHelper:
     PREFIX = Path("/data/data/com.termux/files/usr")
     HOME = Path("/data/data/com.termux/files/home")
     
+    # termux-battery-status is slow on-device; reuse a reading for this long
+    BATTERY_CACHE_TTL = 30
+    _battery_cache = None  # (status dict, monotonic timestamp)
+    
     @classmethod
     def is_termux(cls) -> bool:
         """Check if running in Termux"""
@@ -106,21 +112,30 @@ class TermuxHelper:
             logger.error(f"Failed to setup storage: {e}")
     
     @classmethod
-    def get_battery_status(cls) -> dict:
-        """Get battery status via Termux:API"""
+    async def get_battery_status(cls) -> dict:
+        """Get battery status via Termux:API (cached for BATTERY_CACHE_TTL seconds)"""
         if not cls.is_termux():
             return {}
         
+        now = time.monotonic()
+        if cls._battery_cache and now - cls._battery_cache[1] < cls.BATTERY_CACHE_TTL:
+            return cls._battery_cache[0]
+        
         try:
-            result = subprocess.run(
-                ["termux-battery-status"],
-                capture_output=True,
-                text=True,
-                timeout=5
+            proc = await asyncio.create_subprocess_exec(
+                "termux-battery-status",
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
             )
-            if result.returncode == 0:
-                import json
-                return json.loads(result.stdout)
+            try:
+                stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+                raise
+            if proc.returncode == 0:
+                status = json.loads(stdout)
+                cls._battery_cache = (status, now)
+                return status
         except Exception as e:
             logger.error(f"Failed to get battery status: {e}")
         
@@ -4,7 +4,6 @@ Sanitization and validation utilities
 """
 
 import re
-from urllib.parse import urlparse
 from typing import Optional, List
 
 class InputValidator:
@@ -17,9 +16,6 @@ class InputValidator:
     IP_PATTERN = re.compile(
         r'^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$'
     )
-    URL_PATTERN = re.compile(
-        r'^https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+'
-    )
     
     DANGEROUS_CHARS = re.compile(r'[;&|`$()]')
     PATH_TRAVERSAL = re.compile(r'\.\./|\.\.\\')
@@ -39,11 +35,15 @@ class InputValidator:
     @classmethod
     def validate_url(cls, url: str) -> bool:
         """Validate URL format"""
-        try:
-            result = urlparse(url)
-            return all([result.scheme in ['http', 'https'], result.netloc])
-        except Exception:
+        if not isinstance(url, str):
+            return False
+        scheme, sep, rest = url.partition('://')
+        if not sep or scheme.lower() not in ('http', 'https'):
             return False
+        # Host part ends at the first path, query or fragment delimiter
+        for delim in '/?#':
+            rest = rest.split(delim, 1)[0]
+        return bool(rest)
     
     @classmethod
     def sanitize_command_arg(cls, arg: str) -> str:
@@ -73,11 +73,15 @@ class InputValidator:
     @classmethod
     def validate_scope(cls, scope_items: List[str]) -> List[str]:
         """Validate scope items (domains/IPs)"""
+        # Bind matchers once; scopes can hold thousands of entries
+        domain_match = cls.DOMAIN_PATTERN.match
+        ip_match = cls.IP_PATTERN.match
         valid = []
+        append = valid.append
         for item in scope_items:
             item = item.strip().lower()
-            if cls.validate_domain(item) or cls.validate_ip(item):
-                valid.append(item)
+            if (len(item) <= 253 and domain_match(item)) or ip_match(item):
+                append(item)
         return valid
     
     @classmethod
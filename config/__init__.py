@@ -4,6 +4,7 @@ ReconX Configuration Package
 
 from config.settings import Settings, get_settings, settings
 from pathlib import Path
+import os
 import json
 import yaml
 
@@ -17,36 +18,38 @@ __all__ = [
     "ensure_configs_exist"
 ]
 
+_CONFIG_DIR = Path(__file__).parent
+_TOOLS_PATH = _CONFIG_DIR / "tools.json"
+_WORDLISTS_PATH = _CONFIG_DIR / "wordlists.json"
+_TUNNEL_PATH = _CONFIG_DIR / "tunnel.yaml"
+
+def _load_json(config_path: Path) -> dict:
+    """Parse a JSON config file straight from bytes"""
+    try:
+        with open(config_path, 'rb') as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
 def load_tools_config() -> dict:
     """Load tools configuration from JSON"""
-    config_path = Path(__file__).parent / "tools.json"
-    if not config_path.exists():
-        return {}
-    
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    return _load_json(_TOOLS_PATH)
 
 def load_wordlists_config() -> dict:
     """Load wordlists configuration from JSON"""
-    config_path = Path(__file__).parent / "wordlists.json"
-    if not config_path.exists():
-        return {}
-    
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    return _load_json(_WORDLISTS_PATH)
 
 def load_tunnel_config() -> dict:
     """Load tunnel configuration from YAML"""
-    config_path = Path(__file__).parent / "tunnel.yaml"
-    if not config_path.exists():
+    try:
+        with open(_TUNNEL_PATH, 'rb') as f:
+            return yaml.safe_load(f)
+    except FileNotFoundError:
         return {}
-    
-    with open(config_path, 'r') as f:
-        return yaml.safe_load(f)
 
 def ensure_configs_exist():
     """Ensure all config files exist, create defaults if missing"""
-    config_dir = Path(__file__).parent
+    config_dir = _CONFIG_DIR
     
     files_to_check = [
         "settings.py",
@@ -55,10 +58,10 @@ def ensure_configs_exist():
         "tunnel.yaml"
     ]
     
-    missing = []
-    for filename in files_to_check:
-        if not (config_dir / filename).exists():
-            missing.append(filename)
+    # One directory read instead of a stat() per file
+    with os.scandir(config_dir) as entries:
+        present = {entry.name for entry in entries}
+    missing = [filename for filename in files_to_check if filename not in present]
     
     if missing:
         raise FileNotFoundError(
@@ -19,6 +19,7 @@ class DatabaseSettings(BaseSettings):
     
     class Config:
         env_prefix = "DB_"
+        allow_mutation = False
 
 class LLMSettings(BaseSettings):
     """LLM/Ollama configuration"""
@@ -40,6 +41,7 @@ class LLMSettings(BaseSettings):
     
     class Config:
         env_prefix = "LLM_"
+        allow_mutation = False
 
 class APISettings(BaseSettings):
     """API Server configuration"""
@@ -53,6 +55,7 @@ class APISettings(BaseSettings):
     
     class Config:
         env_prefix = "API_"
+        allow_mutation = False
 
 class ScanSettings(BaseSettings):
     """Scanning configuration"""
@@ -108,6 +111,7 @@ class ScanSettings(BaseSettings):
     
     class Config:
         env_prefix = "SCAN_"
+        allow_mutation = False
 
 class ResilienceSettings(BaseSettings):
     """Power/network outage resilience settings"""
@@ -130,6 +134,7 @@ class ResilienceSettings(BaseSettings):
     
     class Config:
         env_prefix = "RESILIENCE_"
+        allow_mutation = False
 
 class TunnelSettings(BaseSettings):
     """Remote tunnel configuration"""
@@ -158,6 +163,7 @@ class TunnelSettings(BaseSettings):
     
     class Config:
         env_prefix = "TUNNEL_"
+        allow_mutation = False
 
 class NotificationSettings(BaseSettings):
     """Notification channel settings"""
@@ -185,6 +191,7 @@ class NotificationSettings(BaseSettings):
     
     class Config:
         env_prefix = "NOTIFY_"
+        allow_mutation = False
 
 class WordlistSettings(BaseSettings):
     """Wordlist configuration"""
@@ -205,6 +212,7 @@ class WordlistSettings(BaseSettings):
     
     class Config:
         env_prefix = "WORDLIST_"
+        allow_mutation = False
 
 class Settings(BaseSettings):
     """Main ReconX settings"""
@@ -242,6 +250,7 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
+        allow_mutation = False
     
     @validator('base_dir', 'data_dir', 'logs_dir', 'reports_dir', 'wordlists_dir')
     def create_directories(cls, v):
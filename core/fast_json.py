@@ -0,0 +1,25 @@
+"""
+ReconX Fast JSON
+JSON encoding/decoding backed by orjson when it is installed
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; it needs a Rust toolchain on Termux
+    orjson = None
+
+def loads(data):
+    """Decode JSON from str or bytes"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj) -> str:
+    """Encode obj as a compact JSON string"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+JSONDecodeError = orjson.JSONDecodeError if orjson is not None else json.JSONDecodeError
@@ -0,0 +1,158 @@
+"""
+ReconX HTTP Client
+Shared aiohttp session for scanners that fetch over HTTP
+"""
+
+import asyncio
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+try:
+    import aiodns  # noqa: F401
+    from aiohttp.resolver import AsyncResolver
+except ImportError:  # Optional: c-ares resolver instead of threaded getaddrinfo
+    AsyncResolver = None
+
+# Sized for a phone: enough sockets to keep many hosts warm without
+# exhausting Termux's file descriptor limit
+CONNECTION_LIMIT = 256
+CONNECTION_LIMIT_PER_HOST = 32
+DNS_CACHE_TTL = 600
+KEEPALIVE_TIMEOUT = 60
+# Every lookup is raced across these; None is the system (ISP) resolver
+DNS_NAMESERVERS = [None, "1.1.1.1", "8.8.8.8"]
+# Resolved (and in-flight) lookups kept for later scan stages
+DNS_PREFETCH_TTL = 900
+DNS_PREFETCH_CONCURRENCY = 200
+DNS_CACHE_MAX_ENTRIES = 10000
+
+_session: Optional[aiohttp.ClientSession] = None
+_resolver: Optional[AbstractResolver] = None
+
+class RacingResolver(AbstractResolver):
+    """Send each lookup to several resolvers and keep the first answer"""
+    
+    def __init__(self, nameservers: List[Optional[str]]):
+        self._resolvers = [
+            AsyncResolver(nameservers=[ns]) if ns else AsyncResolver()
+            for ns in nameservers
+        ]
+    
+    async def resolve(self, host: str, port: int = 0,
+                      family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        tasks = [
+            asyncio.create_task(resolver.resolve(host, port, family))
+            for resolver in self._resolvers
+        ]
+        error: Optional[BaseException] = None
+        try:
+            # First successful answer wins; a failure just waits for the next one
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    return await next_done
+                except Exception as e:
+                    error = e
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def close(self):
+        for resolver in self._resolvers:
+            await resolver.close()
+
+class CachingResolver(AbstractResolver):
+    """TTL cache in front of another resolver; concurrent lookups of the
+    same host share one in-flight query"""
+    
+    def __init__(self, resolver: AbstractResolver, ttl: float = DNS_PREFETCH_TTL):
+        self._resolver = resolver
+        self._ttl = ttl
+        self._cache: Dict[Tuple[str, int], Tuple[float, asyncio.Task]] = {}
+    
+    async def resolve(self, host: str, port: int = 0,
+                      family: int = socket.AF_INET) -> List[Dict[str, Any]]:
+        key = (host, family)
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        
+        if entry is None or entry[0] < now:
+            if len(self._cache) >= DNS_CACHE_MAX_ENTRIES:
+                self._prune(now)
+            task = asyncio.create_task(self._resolver.resolve(host, 0, family))
+            self._cache[key] = (now + self._ttl, task)
+        else:
+            task = entry[1]
+        
+        try:
+            # Shielded so one cancelled caller doesn't cancel the shared query
+            hosts = await asyncio.shield(task)
+        except Exception:
+            # Failures are not cached
+            if self._cache.get(key, (0, None))[1] is task:
+                del self._cache[key]
+            raise
+        
+        return [{**h, "port": port} for h in hosts]
+    
+    def _prune(self, now: float):
+        """Drop expired entries"""
+        for key in [k for k, (expiry, _) in self._cache.items() if expiry < now]:
+            del self._cache[key]
+    
+    async def close(self):
+        self._cache.clear()
+        await self._resolver.close()
+
+async def get_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use"""
+    global _session, _resolver
+    if _session is None or _session.closed:
+        _resolver = CachingResolver(
+            RacingResolver(DNS_NAMESERVERS) if AsyncResolver else DefaultResolver()
+        )
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                resolver=_resolver,
+                # IPv4 only: AAAA lookups for v4-only hosts just add timeouts
+                family=socket.AF_INET,
+                use_dns_cache=True,
+                limit=CONNECTION_LIMIT,
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                enable_cleanup_closed=True
+            ),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+    return _session
+
+async def prefetch_dns(hosts: Iterable[str], concurrency: int = DNS_PREFETCH_CONCURRENCY):
+    """Warm the shared resolver cache for hosts before they are connected to"""
+    await get_session()
+    resolver = _resolver
+    sem = asyncio.Semaphore(concurrency)
+    
+    async def lookup(host: str):
+        async with sem:
+            try:
+                await resolver.resolve(host, 0, socket.AF_INET)
+            except Exception:
+                pass
+    
+    await asyncio.gather(*[lookup(host) for host in set(hosts)])
+
+async def close_session():
+    """Close the shared HTTP session"""
+    global _session, _resolver
+    if _session is not None and not _session.closed:
+        await _session.close()
+    if _resolver is not None:
+        await _resolver.close()
+    _session = None
+    _resolver = None
@@ -6,9 +6,10 @@ Scheduled re-scanning and change detection
 import asyncio
 import json
 import logging
-from datetime import datetime, timedelta
+import time
 from typing import Dict, List, Optional, Callable
 from dataclasses import dataclass
+from uuid import uuid4
 
 from api.database import DatabaseManager
 from api.tasks import TaskQueue, ScanTask
@@ -27,6 +28,9 @@ class MonitorConfig:
 class ContinuousMonitor:
     """Continuous monitoring for targets"""
     
+    NOTIFY_DEBOUNCE = 1.0
+    SEVERITY_RANK = {"info": 0, "low": 1, "medium": 2, "high": 3, "critical": 4}
+    
     def __init__(self, db: DatabaseManager, task_queue: TaskQueue):
         self.db = db
         self.task_queue = task_queue
@@ -34,6 +38,13 @@ class ContinuousMonitor:
         self.monitors: Dict[str, MonitorConfig] = {}
         self._running = False
         self._tasks: List[asyncio.Task] = []
+        self._last_scan: Dict[str, Optional[int]] = {}  # Unix epoch seconds
+        self._wake = asyncio.Event()
+        
+        # Notifications raised in the same tick are coalesced into one message
+        self._notif_buffer: List[Dict] = []
+        self._notif_event = asyncio.Event()
+        self._notif_flush_task: Optional[asyncio.Task] = None
     
     async def start(self):
         """Start continuous monitoring"""
@@ -49,8 +60,11 @@ class ContinuousMonitor:
     async def stop(self):
         """Stop continuous monitoring"""
         self._running = False
+        self._wake.set()
         for task in self._tasks:
             task.cancel()
+        if self._notif_flush_task:
+            self._notif_flush_task.cancel()
         logger.info("Continuous monitor stopped")
     
     async def add_monitor(self, config: MonitorConfig):
@@ -58,18 +72,20 @@ class ContinuousMonitor:
         self.monitors[config.target_id] = config
         
         # Save to database
-        await self.db._connection.execute("""
-            INSERT OR REPLACE INTO continuous_monitors 
-            (target_id, interval_hours, enabled_modules, alert_on_changes, created_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            config.target_id,
-            config.interval_hours,
-            json.dumps(config.enabled_modules or []),
-            config.alert_on_changes,
-            datetime.utcnow().isoformat()
-        ))
-        await self.db._connection.commit()
+        async with self.db.transaction() as conn:
+            await conn.execute("""
+                INSERT OR REPLACE INTO continuous_monitors 
+                (target_id, interval_hours, enabled_modules, alert_on_changes, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                config.target_id,
+                config.interval_hours,
+                json.dumps(config.enabled_modules or []),
+                config.alert_on_changes,
+                int(time.time())
+            ))
+        self._last_scan[config.target_id] = await self._get_last_scan_time(config.target_id)
+        self._wake.set()
         
         logger.info(f"Added monitor for target {config.target_id}")
     
@@ -77,69 +93,94 @@ class ContinuousMonitor:
         """Remove target from monitoring"""
         if target_id in self.monitors:
             del self.monitors[target_id]
+            self._last_scan.pop(target_id, None)
             
-            await self.db._connection.execute("""
-                DELETE FROM continuous_monitors WHERE target_id = ?
-            """, (target_id,))
-            await self.db._connection.commit()
+            async with self.db.transaction() as conn:
+                await conn.execute("""
+                    DELETE FROM continuous_monitors WHERE target_id = ?
+                """, (target_id,))
+            self._wake.set()
             
             logger.info(f"Removed monitor for target {target_id}")
     
     async def _load_monitors(self):
-        """Load monitors from database"""
+        """Load monitors and their last scan times from database"""
         try:
-            async with self.db._connection.execute(
-                "SELECT * FROM continuous_monitors"
-            ) as cursor:
-                rows = await cursor.fetchall()
-                
-                for row in rows:
-                    config = MonitorConfig(
-                        target_id=row["target_id"],
-                        interval_hours=row["interval_hours"],
-                        enabled_modules=json.loads(row["enabled_modules"]) if row["enabled_modules"] else None,
-                        alert_on_changes=row["alert_on_changes"]
-                    )
-                    self.monitors[row["target_id"]] = config
+            rows = await self.db._connection.execute_fetchall("""
+                SELECT m.target_id, m.interval_hours, m.enabled_modules,
+                       m.alert_on_changes,
+                       CAST(strftime('%s', MAX(s.created_at)) AS INTEGER) AS last_scan
+                FROM continuous_monitors m
+                LEFT JOIN scans s ON s.target_id = m.target_id
+                GROUP BY m.target_id
+            """)
+            
+            for row in rows:
+                config = MonitorConfig(
+                    target_id=row["target_id"],
+                    interval_hours=row["interval_hours"],
+                    enabled_modules=json.loads(row["enabled_modules"]) if row["enabled_modules"] else None,
+                    alert_on_changes=row["alert_on_changes"]
+                )
+                self.monitors[row["target_id"]] = config
+                self._last_scan[row["target_id"]] = row["last_scan"]
         
         except Exception as e:
             logger.error(f"Failed to load monitors: {e}")
     
     async def _monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop, sleeping until the next monitor is due"""
         while self._running:
             try:
-                now = datetime.utcnow()
+                now = int(time.time())
+                next_due: Optional[int] = None
                 
-                for target_id, config in self.monitors.items():
+                for target_id, config in list(self.monitors.items()):
                     # Check if it's time to scan
-                    last_scan = await self._get_last_scan_time(target_id)
+                    last_scan = self._last_scan.get(target_id)
+                    
+                    if last_scan is None or now >= last_scan + config.interval_hours * 3600:
+                        # The cache misses scans started outside the monitor
+                        db_last = await self._get_last_scan_time(target_id)
+                        if db_last and (last_scan is None or db_last > last_scan):
+                            last_scan = self._last_scan[target_id] = db_last
                     
                     if last_scan:
-                        next_scan = last_scan + timedelta(hours=config.interval_hours)
-                        if now < next_scan:
+                        due = last_scan + config.interval_hours * 3600
+                        if now < due:
+                            next_due = due if next_due is None else min(next_due, due)
                             continue
                     
                     # Trigger scan
                     await self._trigger_scan(target_id, config)
+                    due = now + config.interval_hours * 3600
+                    next_due = due if next_due is None else min(next_due, due)
                 
-                # Wait before next check
-                await asyncio.sleep(300)  # Check every 5 minutes
+                # Sleep until the next scan is due or a monitor is added/removed
+                delay = None
+                if next_due is not None:
+                    delay = max(0.0, next_due - time.time())
+                await self._wait_for_wake(delay)
                 
             except Exception as e:
                 logger.error(f"Monitoring loop error: {e}")
                 await asyncio.sleep(60)
     
-    async def _get_last_scan_time(self, target_id: str) -> Optional[datetime]:
-        """Get last scan time for target"""
-        async with self.db._connection.execute("""
-            SELECT MAX(created_at) as last_scan 
+    async def _get_last_scan_time(self, target_id: str) -> Optional[int]:
+        """Get last scan time for target as Unix epoch seconds"""
+        rows = await self.db._connection.execute_fetchall("""
+            SELECT CAST(strftime('%s', MAX(created_at)) AS INTEGER) AS last_scan
             FROM scans WHERE target_id = ?
-        """, (target_id,)) as cursor:
-            row = await cursor.fetchone()
-            if row and row["last_scan"]:
-                return datetime.fromisoformat(row["last_scan"])
-        return None
+        """, (target_id,))
+        return rows[0]["last_scan"] if rows else None
+    
+    async def _wait_for_wake(self, timeout: Optional[float]):
+        """Wait for the wake event or until timeout elapses"""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wake.clear()
     
     async def _trigger_scan(self, target_id: str, config: MonitorConfig):
         """Trigger a new scan"""
@@ -147,7 +188,7 @@ class ContinuousMonitor:
         
         # Create scan task
         task = ScanTask(
-            scan_id=str(__import__('uuid').uuid4()),
+            scan_id=uuid4().hex,
             target_id=target_id,
             config={
                 "modules": config.enabled_modules or ["subdomain_enum", "http_probe"],
@@ -157,23 +198,70 @@ class ContinuousMonitor:
         )
         
         await self.task_queue.add_task(task)
+        self._last_scan[target_id] = int(time.time())
         
         # Notify
         if config.alert_on_changes:
-            await self.notification_mgr.send_notification(
+            self._queue_notification(
                 title="🔍 Scheduled Scan Started",
                 message=f"Continuous monitoring scan started for target {target_id}",
                 severity="info"
             )
     
+    def _queue_notification(self, title: str, message: str, severity: str = "info",
+                            fields: Optional[Dict] = None):
+        """Buffer a notification for the next batched send"""
+        self._notif_buffer.append({
+            "title": title,
+            "message": message,
+            "severity": severity,
+            "fields": fields
+        })
+        self._notif_event.set()
+        
+        if self._notif_flush_task is None or self._notif_flush_task.done():
+            self._notif_flush_task = asyncio.create_task(self._flush_notifications())
+    
+    async def _flush_notifications(self):
+        """Send buffered notifications as one message per debounce window"""
+        while True:
+            await self._notif_event.wait()
+            await asyncio.sleep(self.NOTIFY_DEBOUNCE)
+            self._notif_event.clear()
+            
+            batch, self._notif_buffer = self._notif_buffer, []
+            if not batch:
+                continue
+            
+            try:
+                if len(batch) == 1:
+                    await self.notification_mgr.send_notification(**batch[0])
+                    continue
+                
+                fields = {}
+                for i, notif in enumerate(batch, 1):
+                    fields[f"{i}. {notif['title']}"] = notif["message"]
+                    for key, value in (notif["fields"] or {}).items():
+                        fields[f"{i}. {key}"] = value
+                
+                severity = max(
+                    (n["severity"] for n in batch),
+                    key=lambda s: self.SEVERITY_RANK.get(s, 0)
+                )
+                await self.notification_mgr.send_notification(
+                    title="🔍 Monitor Update",
+                    message=f"{len(batch)} monitoring events",
+                    severity=severity,
+                    fields=fields
+                )
+            except Exception as e:
+                logger.error(f"Failed to send monitor notifications: {e}")
+    
     async def compare_scans(self, old_scan_id: str, new_scan_id: str) -> Dict:
         """Compare two scans and identify changes"""
         # Get results from both scans
-        old_subs = await self.db.get_subdomains(old_scan_id)
-        new_subs = await self.db.get_subdomains(new_scan_id)
-        
-        old_set = {s["subdomain"] for s in old_subs}
-        new_set = {s["subdomain"] for s in new_subs}
+        old_set = await self.db.get_subdomain_names(old_scan_id)
+        new_set = await self.db.get_subdomain_names(new_scan_id)
         
         changes = {
             "new_subdomains": list(new_set - old_set),
@@ -184,7 +272,7 @@ class ContinuousMonitor:
         
         # Alert on new subdomains
         if changes["new_subdomains"]:
-            await self.notification_mgr.send_notification(
+            self._queue_notification(
                 title="🆕 New Subdomains Discovered",
                 message=f"Found {len(changes['new_subdomains'])} new subdomains",
                 severity="medium",
@@ -195,5 +283,3 @@ class ContinuousMonitor:
             )
         
         return changes
-
-import uuid
@@ -4,9 +4,11 @@ Main orchestration logic for reconnaissance workflows
 """
 
 import asyncio
+import functools
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 
 from api.database import DatabaseManager
 from api.tasks import ScanTask
@@ -26,6 +28,18 @@ from core.scanners.wayback_machine import WaybackMachine
 
 logger = logging.getLogger(__name__)
 
+def _build_levels(order: List[str], dependencies: Dict[str, tuple]) -> List[List[str]]:
+    """Group modules into levels whose members only depend on earlier levels"""
+    levels: List[List[str]] = []
+    placed: Dict[str, int] = {}
+    for module in order:
+        level = max((placed[dep] + 1 for dep in dependencies[module]), default=0)
+        placed[module] = level
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(module)
+    return levels
+
 class ScannerEngine:
     """Main scanning orchestrator"""
     
@@ -41,6 +55,36 @@ class ScannerEngine:
         "nuclei_scan"
     ]
     
+    # Results each module reads from previous_results; modules in the same
+    # level have no dependency on each other and run concurrently
+    MODULE_DEPENDENCIES = {
+        "subdomain_enum": (),
+        "dns_resolution": ("subdomain_enum",),
+        "http_probe": ("subdomain_enum",),
+        "port_scan": ("subdomain_enum", "dns_resolution"),
+        "wayback_urls": (),
+        "js_analysis": ("http_probe",),
+        "gf_patterns": ("http_probe", "wayback_urls"),
+        "fuzzing": ("http_probe",),
+        "nuclei_scan": ("http_probe",)
+    }
+    
+    MODULE_LEVELS = _build_levels(MODULE_ORDER, MODULE_DEPENDENCIES)
+    
+    MODULE_INDEX = {name: i for i, name in enumerate(MODULE_ORDER)}
+    
+    SCANNER_CLASSES = {
+        "subdomain_enum": SubdomainEnumerator,
+        "dns_resolution": DNSResolver,
+        "http_probe": HTTPProber,
+        "port_scan": PortScanner,
+        "wayback_urls": WaybackMachine,
+        "js_analysis": JSAnalyzer,
+        "gf_patterns": GFAnalyzer,
+        "fuzzing": Fuzzer,
+        "nuclei_scan": NucleiScanner
+    }
+    
     def __init__(self, db: DatabaseManager, task: ScanTask):
         self.db = db
         self.task = task
@@ -48,25 +92,25 @@ class ScannerEngine:
         self.target_id = task.target_id
         self.config = task.config
         
+        # Read-only per-module configs, resolved once per scan
+        self._module_configs = {
+            m: MappingProxyType(self.config.get(m, {})) for m in self.MODULE_ORDER
+        }
+        
         # Initialize components
         self.subprocess_mgr = SubprocessManager()
         self.state_checkpoint = StateCheckpoint(db, self.scan_id)
-        self.llm_manager = LLMManager()
+        self.llm_manager: Optional[LLMManager] = None
         
-        # Initialize scanners
-        self.scanners = {
-            "subdomain_enum": SubdomainEnumerator(self.subprocess_mgr, db),
-            "dns_resolution": DNSResolver(self.subprocess_mgr, db),
-            "http_probe": HTTPProber(self.subprocess_mgr, db),
-            "port_scan": PortScanner(self.subprocess_mgr, db),
-            "wayback_urls": WaybackMachine(self.subprocess_mgr, db),
-            "js_analysis": JSAnalyzer(self.subprocess_mgr, db),
-            "gf_patterns": GFAnalyzer(self.subprocess_mgr, db),
-            "fuzzing": Fuzzer(self.subprocess_mgr, db),
-            "nuclei_scan": NucleiScanner(self.subprocess_mgr, db, self.llm_manager)
-        }
+        # Scanners are created on first use so unused modules cost nothing
+        self.scanners: Dict[str, Any] = {}
         
         self.results_cache: Dict[str, Any] = {}
+        self._completed: Set[str] = set()
+        
+        # Status/checkpoint writes are queued and persisted off the critical path
+        self._persist_queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        self._persist_worker: Optional[asyncio.Task] = None
         self._paused = False
         self._stopped = False
     
@@ -76,93 +120,157 @@ class ScannerEngine:
         
         # Check for resume state
         resume_state = await self.state_checkpoint.load_state()
-        start_index = 0
         
         if resume_state and resume_state.get("can_resume"):
             logger.info(f"Resuming scan from module: {resume_state.get('current_module')}")
-            start_index = self._get_module_index(resume_state.get("current_module"))
+            self._completed = set(resume_state.get("completed_modules", []))
             self.results_cache = resume_state.get("results_cache", {})
         
-        # Execute modules in order
-        for i, module_name in enumerate(self.MODULE_ORDER[start_index:], start=start_index):
-            if self._stopped:
-                logger.info("Scan stopped by user")
-                break
-            
-            if self._paused:
-                logger.info("Scan paused, waiting...")
-                await self._wait_for_resume()
-            
-            if self._stopped:
-                break
+        # Limit how many heavy modules share the device at once
+        limit = asyncio.Semaphore(self.config.get("max_parallel_modules", 3))
+        self._persist_worker = asyncio.create_task(self._persist_loop())
+        
+        try:
+            # Execute dependency levels in order, modules within a level concurrently
+            for level in self.MODULE_LEVELS:
+                if self._stopped:
+                    logger.info("Scan stopped by user")
+                    break
+                
+                if self._paused:
+                    logger.info("Scan paused, waiting...")
+                    await self._wait_for_resume()
+                
+                if self._stopped:
+                    break
+                
+                pending = [m for m in level if m not in self._completed]
+                outcomes = await asyncio.gather(
+                    *(self._run_module(module_name, limit) for module_name in pending),
+                    return_exceptions=True
+                )
+                for outcome in outcomes:
+                    if isinstance(outcome, Exception):
+                        raise outcome
             
-            await self._run_module(module_name, i)
+            # Flush queued writes before clearing the checkpoint
+            await self._persist_queue.join()
+        finally:
+            self._persist_worker.cancel()
         
         if not self._stopped:
             logger.info(f"Scan {self.scan_id} completed successfully")
             await self.state_checkpoint.clear_state()
     
-    async def _run_module(self, module_name: str, index: int):
-        """Run a single scanning module"""
-        logger.info(f"[{self.scan_id}] Running module: {module_name}")
-        
-        self.task.current_module = module_name
-        self.task.progress[module_name] = 0
-        
-        await self.db.update_scan_status(
-            self.scan_id,
-            "running",
-            current_task=f"Running {module_name}",
-            progress=self.task.progress
-        )
-        
+    async def _persist(self, write: Callable[[], Awaitable[None]]):
+        """Queue a database/checkpoint write for the background worker"""
         try:
-            scanner = self.scanners.get(module_name)
-            if not scanner:
-                logger.warning(f"Unknown module: {module_name}")
+            self._persist_queue.put_nowait(write)
+        except asyncio.QueueFull:
+            await self._persist_queue.put(write)
+    
+    async def _persist_loop(self):
+        """Apply queued writes in order"""
+        while True:
+            write = await self._persist_queue.get()
+            try:
+                await write()
+            except Exception as e:
+                logger.error(f"Failed to persist scan state: {e}")
+            finally:
+                self._persist_queue.task_done()
+    
+    async def _run_module(self, module_name: str, limit: asyncio.Semaphore):
+        """Run a single scanning module"""
+        async with limit:
+            if self._paused:
+                await self._wait_for_resume()
+            if self._stopped:
                 return
             
-            # Execute module with dependency injection
-            module_results = await scanner.scan(
-                target_id=self.target_id,
-                scan_id=self.scan_id,
-                config=self.config.get(module_name, {}),
-                previous_results=self.results_cache
-            )
+            logger.info(f"[{self.scan_id}] Running module: {module_name}")
             
-            # Cache results for downstream modules
-            self.results_cache[module_name] = module_results
+            self.task.current_module = module_name
+            self.task.progress[module_name] = 0
             
-            # Update progress
-            self.task.progress[module_name] = 100
-            await self.db.update_scan_status(
+            await self._persist(functools.partial(
+                self.db.update_scan_status,
                 self.scan_id,
                 "running",
-                progress=self.task.progress
-            )
-            
-            # Save checkpoint
-            await self.state_checkpoint.save_state(
-                current_module=module_name,
-                completed_modules=self.MODULE_ORDER[:index+1],
-                pending_modules=self.MODULE_ORDER[index+1:],
-                results_cache=self.results_cache
-            )
+                current_task=f"Running {module_name}",
+                progress=dict(self.task.progress)
+            ))
             
-        except Exception as e:
-            logger.error(f"Module {module_name} failed: {e}")
-            # Continue with next module unless critical
-            if self.config.get("stop_on_error", False):
-                raise
+            try:
+                scanner = self._get_scanner(module_name)
+                if not scanner:
+                    logger.warning(f"Unknown module: {module_name}")
+                    return
+                
+                # Execute module with dependency injection
+                module_results = await scanner.scan(
+                    target_id=self.target_id,
+                    scan_id=self.scan_id,
+                    config=self._module_configs[module_name],
+                    previous_results=self.results_cache
+                )
+                
+                # Cache results for downstream modules
+                self.results_cache[module_name] = module_results
+                self._completed.add(module_name)
+                
+                # Update progress and save checkpoint in one queued write
+                self.task.progress[module_name] = 100
+                await self._persist(functools.partial(
+                    self._save_progress,
+                    module_name,
+                    dict(self.task.progress),
+                    sorted(self._completed, key=self._get_module_index),
+                    [m for m in self.MODULE_ORDER if m not in self._completed],
+                    dict(self.results_cache)
+                ))
+                
+            except Exception as e:
+                logger.error(f"Module {module_name} failed: {e}")
+                # Continue with next module unless critical
+                if self.config.get("stop_on_error", False):
+                    raise
+    
+    async def _save_progress(self, module_name: str, progress: Dict[str, int],
+                             completed: List[str], pending: List[str],
+                             results_cache: Dict[str, Any]):
+        """Persist module progress and the resume checkpoint"""
+        await self.db.update_scan_status(self.scan_id, "running", progress=progress)
+        await self.state_checkpoint.save_state(
+            current_module=module_name,
+            completed_modules=completed,
+            pending_modules=pending,
+            results_cache=results_cache
+        )
+    
+    def _get_scanner(self, module_name: str) -> Optional[Any]:
+        """Get the scanner for a module, instantiating it on first use"""
+        scanner = self.scanners.get(module_name)
+        if scanner is not None:
+            return scanner
+        
+        scanner_cls = self.SCANNER_CLASSES.get(module_name)
+        if not scanner_cls:
+            return None
+        
+        if scanner_cls is NucleiScanner:
+            if self.llm_manager is None:
+                self.llm_manager = LLMManager()
+            scanner = scanner_cls(self.subprocess_mgr, self.db, self.llm_manager)
+        else:
+            scanner = scanner_cls(self.subprocess_mgr, self.db)
+        
+        self.scanners[module_name] = scanner
+        return scanner
     
     def _get_module_index(self, module_name: Optional[str]) -> int:
         """Get index of module in execution order"""
-        if not module_name:
-            return 0
-        try:
-            return self.MODULE_ORDER.index(module_name)
-        except ValueError:
-            return 0
+        return self.MODULE_INDEX.get(module_name, 0)
     
     async def _wait_for_resume(self):
         """Wait for scan to be resumed"""
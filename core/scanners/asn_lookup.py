@@ -3,10 +3,12 @@ ASN Lookup Scanner
 ASN and IP range enumeration
 """
 
+import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 
 from api.database import DatabaseManager
+from core import fast_json
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -29,50 +31,45 @@ class ASNLookup:
     ) -> Dict[str, Any]:
         """Perform ASN lookup"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
-        
         # Get IPs from DNS resolution
         dns_data = previous_results.get("dns_resolution", {})
         resolutions = dns_data.get("resolutions", {})
         
-        # Get first IP for ASN lookup
-        sample_ip = None
-        for subdomain, ips in resolutions.items():
-            if ips:
-                sample_ip = ips[0]
-                break
+        unique_ips = {ip for ips in resolutions.values() for ip in ips}
         
-        if not sample_ip:
+        if not unique_ips:
             logger.warning("No IPs available for ASN lookup")
             return {"asns_found": 0}
         
-        # Run asnmap
+        # Run asnmap once over every resolved IP, fed through stdin
         await self.tool_manager.ensure_tool("asnmap")
         
-        cmd = f"asnmap -ip {sample_ip} -json"
-        
         try:
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=60)
-            
-            import json
-            asn_data = json.loads(stdout.strip())
+            stdout = await self.subprocess_mgr.run_simple(
+                "asnmap -silent -json",
+                timeout=120,
+                input_data="\n".join(unique_ips)
+            )
             
+            # asnmap -json emits one JSON object per line
             asns = []
-            for entry in asn_data:
-                asn_info = {
+            for line in stdout.splitlines():
+                if not line:
+                    continue
+                entry = fast_json.loads(line)
+                asns.append({
                     "asn": entry.get("asn"),
                     "ip": entry.get("ip"),
                     "desc": entry.get("desc", ""),
                     "country": entry.get("country", "")
-                }
-                asns.append(asn_info)
-                
-                # Update target with ASN info
-                await self._update_target_asn(target_id, asn_info)
+                })
+            
+            # Update target with all discovered ASNs at once
+            await self._update_target_asns(target_id, {a["asn"] for a in asns if a["asn"]})
             
             logger.info(f"Found {len(asns)} ASN entries")
             
@@ -85,22 +82,23 @@ class ASNLookup:
             logger.error(f"ASN lookup failed: {e}")
             return {"asns_found": 0}
     
-    async def _update_target_asn(self, target_id: str, asn_info: Dict):
-        """Update target with ASN information"""
+    async def _update_target_asns(self, target_id: str, asns: Set[Any]):
+        """Merge ASNs into the target's ASN list"""
+        if not asns:
+            return
+        
         try:
-            target = await self.db.get_target(target_id)
-            if target:
-                asn_list = target.get("asn_list", [])
-                if isinstance(asn_list, str):
-                    import json
-                    asn_list = json.loads(asn_list)
-                
-                if asn_info["asn"] not in asn_list:
-                    asn_list.append(asn_info["asn"])
-                
-                await self.db._connection.execute("""
-                    UPDATE targets SET asn_list = ? WHERE id = ?
-                """, (json.dumps(asn_list), target_id))
-                await self.db._connection.commit()
+            # Union in place with json1 instead of a read-modify-write round trip
+            async with self.db.transaction() as conn:
+                await conn.execute("""
+                    UPDATE targets SET asn_list = (
+                        SELECT json_group_array(value) FROM (
+                            SELECT value FROM json_each(COALESCE(targets.asn_list, '[]'))
+                            UNION
+                            SELECT value FROM json_each(?)
+                        )
+                    )
+                    WHERE id = ?
+                """, (json.dumps(list(asns)), target_id))
         except Exception as e:
             logger.error(f"Failed to update target ASN: {e}")
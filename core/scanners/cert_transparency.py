@@ -3,12 +3,22 @@ Certificate Transparency Scanner
 Query CT logs for subdomain discovery
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import re
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
 import aiohttp
 
+try:
+    import ijson
+except ImportError:  # Optional: streams large crt.sh responses
+    ijson = None
+
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 
 logger = logging.getLogger(__name__)
@@ -22,10 +32,57 @@ class CertTransparency:
         "facebook": "https://graph.facebook.com/certificates?query={domain}&fields=certificate_pem&access_token="  # Requires token
     }
     
+    # CT endpoints rate-limit hard: cap requests across all scans and back off
+    # on transient failures
+    _ct_semaphore = asyncio.Semaphore(4)
+    RETRY_STATUSES = {429, 502, 503, 504}
+    MAX_ATTEMPTS = 5
+    MAX_BACKOFF = 30
+    
+    # crt.sh can take well over the shared session's default timeout
+    REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=120)
+    
+    # CT results change slowly; reuse them across monitor runs for this long
+    CACHE_TTL = 6 * 3600
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
     
+    @asynccontextmanager
+    async def _get(self, url: str, **kwargs):
+        """GET a CT endpoint with a concurrency cap and exponential backoff"""
+        session = await get_session()
+        kwargs.setdefault("timeout", self.REQUEST_TIMEOUT)
+        backoff = 1.0
+        
+        async with self._ct_semaphore:
+            for attempt in range(1, self.MAX_ATTEMPTS + 1):
+                try:
+                    resp = await session.get(url, **kwargs)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == self.MAX_ATTEMPTS:
+                        raise
+                    logger.warning(f"CT request to {url} failed ({e}), retrying in {backoff:.0f}s")
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.MAX_BACKOFF)
+                    continue
+                
+                if resp.status in self.RETRY_STATUSES and attempt < self.MAX_ATTEMPTS:
+                    retry_after = resp.headers.get("Retry-After", "")
+                    wait = min(float(retry_after), self.MAX_BACKOFF) if retry_after.isdigit() else backoff
+                    resp.release()
+                    logger.warning(f"CT endpoint returned {resp.status}, retrying in {wait:.0f}s")
+                    await asyncio.sleep(wait)
+                    backoff = min(backoff * 2, self.MAX_BACKOFF)
+                    continue
+                
+                try:
+                    yield resp
+                finally:
+                    resp.release()
+                return
+    
     async def scan(
         self,
         target_id: str,
@@ -35,84 +92,116 @@ class CertTransparency:
     ) -> Dict[str, Any]:
         """Query certificate transparency logs"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
-        
-        all_certs = []
+        queries = []
         
         # crt.sh
         if config.get("use_crtsh", True):
-            crtsh_results = await self._query_crtsh(domain)
-            all_certs.extend(crtsh_results)
+            queries.append(self._query_cached("crtsh", domain, self._query_crtsh))
         
         # CertSpotter
         if config.get("use_certspotter", False):  # Requires API key
-            spotter_results = await self._query_certspotter(domain)
-            all_certs.extend(spotter_results)
+            queries.append(self._query_cached("certspotter", domain, self._query_certspotter))
         
-        # Parse and extract subdomains
-        subdomains = set()
-        for cert in all_certs:
-            for name in cert.get("dns_names", []):
-                if domain in name:
-                    subdomains.add(name)
+        # Filter all names in one regex pass, keeping only names anchored to
+        # the target domain and dropping wildcard prefixes
+        pattern = re.compile(rf"(?m)^(?:\*\.)?((?:[\w-]+\.)*{re.escape(domain)})$")
+        chunks: List[str] = []
+        cert_count = 0
+        for results in await asyncio.gather(*queries, return_exceptions=True):
+            if isinstance(results, Exception):
+                logger.error(f"CT log query failed: {results}")
+                continue
+            count, names = results
+            cert_count += count
+            chunks.append("\n".join(names))
         
-        logger.info(f"CT logs: {len(all_certs)} certs, {len(subdomains)} unique subdomains")
+        subdomains = set(pattern.findall("\n".join(chunks)))
+        
+        logger.info(f"CT logs: {cert_count} certs, {len(subdomains)} unique subdomains")
         
         return {
-            "certificates": len(all_certs),
+            "certificates": cert_count,
             "subdomains_found": len(subdomains),
             "subdomains": list(subdomains)
         }
     
-    async def _query_crtsh(self, domain: str) -> List[Dict]:
-        """Query crt.sh"""
+    async def _query_cached(
+        self,
+        source: str,
+        domain: str,
+        query: Callable[[str], Awaitable[Tuple[int, Iterable[str]]]]
+    ) -> Tuple[int, Iterable[str]]:
+        """Serve a CT source from the SQLite cache, fetching it when stale"""
+        try:
+            cached = await self.db.get_ct_cache(domain, source, self.CACHE_TTL)
+            if cached is not None:
+                logger.debug(f"Using cached {source} results for {domain}")
+                return cached
+        except Exception as e:
+            logger.warning(f"CT cache lookup failed: {e}")
+        
+        count, names = await query(domain)
+        if not count:
+            return count, names
+        
+        unique_names = list(set(names))
+        try:
+            await self.db.set_ct_cache(domain, source, count, unique_names)
+        except Exception as e:
+            logger.warning(f"CT cache store failed: {e}")
+        return count, unique_names
+    
+    async def _query_crtsh(self, domain: str) -> Tuple[int, Iterable[str]]:
+        """Query crt.sh, returning the certificate count and their DNS names"""
         url = f"https://crt.sh/?q=%.{domain}&output=json"
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, timeout=120) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        
-                        certs = []
-                        for entry in data:
-                            cert = {
-                                "id": entry.get("id"),
-                                "issuer": entry.get("issuer_name"),
-                                "dns_names": entry.get("name_value", "").split("\n"),
-                                "not_before": entry.get("not_before"),
-                                "not_after": entry.get("not_after")
-                            }
-                            certs.append(cert)
-                        
-                        return certs
-            except Exception as e:
-                logger.error(f"crt.sh query failed: {e}")
-        
-        return []
+        try:
+            async with self._get(url) as resp:
+                if resp.status == 200:
+                    if ijson is not None:
+                        # Parse entries as they arrive, keeping only name_value
+                        count = 0
+                        names: List[str] = []
+                        async for entry in ijson.items(resp.content, "item"):
+                            count += 1
+                            names.extend(entry.get("name_value", "").split("\n"))
+                        return count, names
+                    
+                    data = fast_json.loads(await resp.read())
+                    names = (
+                        name
+                        for entry in data
+                        for name in entry.get("name_value", "").split("\n")
+                    )
+                    return len(data), names
+        except Exception as e:
+            logger.error(f"crt.sh query failed: {e}")
+        
+        return 0, []
     
-    async def _query_certspotter(self, domain: str) -> List[Dict]:
-        """Query CertSpotter API"""
+    async def _query_certspotter(self, domain: str) -> Tuple[int, Iterable[str]]:
+        """Query CertSpotter API, returning the issuance count and their DNS names"""
         # Requires API key
         api_key = ""  # Would load from config
         
         if not api_key:
             logger.debug("No CertSpotter API key configured")
-            return []
+            return 0, []
         
-        url = f"https://api.certspotter.com/v1/issuances?domain={domain}&include_subdomains=true"
+        url = f"https://api.certspotter.com/v1/issuances?domain={domain}&include_subdomains=true&expand=dns_names"
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                headers = {"Authorization": f"Bearer {api_key}"}
-                async with session.get(url, headers=headers, timeout=60) as resp:
-                    if resp.status == 200:
-                        return await resp.json()
-            except Exception as e:
-                logger.error(f"CertSpotter query failed: {e}")
+        try:
+            headers = {"Authorization": f"Bearer {api_key}"}
+            async with self._get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                if resp.status == 200:
+                    data = fast_json.loads(await resp.read())
+                    names = (name for entry in data for name in entry.get("dns_names", []))
+                    return len(data), names
+        except Exception as e:
+            logger.error(f"CertSpotter query failed: {e}")
         
-        return []
+        return 0, []
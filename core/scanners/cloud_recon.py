@@ -3,10 +3,28 @@ Cloud Reconnaissance Scanner
 S3, GCP, Azure bucket enumeration
 """
 
+import asyncio
+import heapq
 import logging
-from typing import Dict, List, Any, Optional
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import Dict, Iterator, List, Any, Optional, Set
 
 import aiohttp
+from aiohttp.resolver import DefaultResolver
+
+try:
+    import aiodns  # noqa: F401
+    from aiohttp.resolver import AsyncResolver
+except ImportError:  # Optional: c-ares resolver instead of threaded getaddrinfo
+    AsyncResolver = None
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # Optional: S3 permission checks
+    boto3 = None
 
 from api.database import DatabaseManager
 from core.subprocess_manager import SubprocessManager
@@ -14,13 +32,133 @@ from core.tool_manager import ToolManager
 
 logger = logging.getLogger(__name__)
 
+# Environment/purpose words most often seen in real bucket names, most
+# frequent first; candidates are generated in this order
+BUCKET_TOKENS = (
+    "prod", "dev", "test", "staging", "backup", "backups", "data", "assets",
+    "static", "media", "uploads", "files", "images", "img", "logs", "public",
+    "private", "www", "web", "cdn", "content", "storage", "archive", "db",
+    "internal", "qa", "uat", "stage", "production", "development", "app",
+    "api", "docs", "downloads", "temp", "tmp", "old", "new", "bucket", "s3",
+    "resources", "config", "reports", "export", "exports", "dump", "release",
+    "releases", "builds", "artifacts", "terraform", "deploy", "site", "video"
+)
+
+BUCKET_SEPARATORS = ("-", ".", "")
+
 class CloudRecon:
     """Cloud service enumeration"""
     
+    MAX_CONCURRENT_CHECKS = 16
+    DEFAULT_MAX_CANDIDATES = 200
+    
+    # Storage endpoints throttle bursts; retry those instead of losing findings
+    RETRY_STATUSES = {429, 503}
+    MAX_ATTEMPTS = 3
+    MAX_BACKOFF = 4
+    S3_PERMS_TIMEOUT = 5
+    
+    # Findings are persisted by a background writer in small batches
+    WRITE_BATCH_SIZE = 100
+    WRITE_BATCH_WINDOW = 0.2
+    DNS_NAMESERVERS = ["1.1.1.1", "8.8.8.8"]
+    DNS_CACHE_TTL = 600
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
         self.tool_manager = ToolManager()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._vuln_queue: asyncio.Queue = asyncio.Queue()
+        self._resolver = None
+        self._s3_client = None
+    
+    def _get_resolver(self):
+        """Get the DNS resolver shared by the session and host pre-checks"""
+        if self._resolver is None:
+            if AsyncResolver is not None:
+                self._resolver = AsyncResolver(nameservers=self.DNS_NAMESERVERS)
+            else:
+                self._resolver = DefaultResolver()
+        return self._resolver
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=64,
+                    limit_per_host=16,
+                    resolver=self._get_resolver(),
+                    ttl_dns_cache=self.DNS_CACHE_TTL,
+                    use_dns_cache=True,
+                    enable_cleanup_closed=True
+                )
+            )
+        return self._session
+    
+    async def close(self):
+        """Release the shared HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._resolver is not None:
+            await self._resolver.close()
+        self._resolver = None
+    
+    @asynccontextmanager
+    async def _request(self, session: aiohttp.ClientSession, method: str, url: str, **kwargs):
+        """Issue a storage probe, retrying throttling and transient errors"""
+        backoff = 0.5
+        
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            try:
+                resp = await session.request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == self.MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+                continue
+            
+            if resp.status in self.RETRY_STATUSES and attempt < self.MAX_ATTEMPTS:
+                retry_after = resp.headers.get("Retry-After", "")
+                wait = min(float(retry_after), self.MAX_BACKOFF) if retry_after.isdigit() else backoff
+                resp.release()
+                await asyncio.sleep(wait)
+                backoff = min(backoff * 2, self.MAX_BACKOFF)
+                continue
+            
+            try:
+                yield resp
+            finally:
+                resp.release()
+            return
+    
+    async def _drain_writer(self, scan_id: str):
+        """Persist queued findings in batches off the probe path"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._vuln_queue.get()]
+            deadline = loop.time() + self.WRITE_BATCH_WINDOW
+            
+            while len(batch) < self.WRITE_BATCH_SIZE:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._vuln_queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                await self.db.add_vulnerabilities(scan_id, batch)
+            except Exception as e:
+                logger.error(f"Failed to save cloud findings: {e}")
+            finally:
+                for _ in batch:
+                    self._vuln_queue.task_done()
     
     async def scan(
         self,
@@ -31,29 +169,38 @@ class CloudRecon:
     ) -> Dict[str, Any]:
         """Scan for cloud resources"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
         name = domain.replace(".", "-")
         
         findings = []
         
-        # S3 Buckets
-        if config.get("scan_s3", True):
-            s3_results = await self._scan_s3(name, domain, scan_id)
-            findings.extend(s3_results)
+        # Providers are independent I/O pipelines; run them side by side
+        providers = [
+            (config.get("scan_s3", True), self._scan_s3),
+            (config.get("scan_gcp", True), self._scan_gcp),
+            (config.get("scan_azure", True), self._scan_azure)
+        ]
         
-        # GCP Buckets
-        if config.get("scan_gcp", True):
-            gcp_results = await self._scan_gcp(name, domain, scan_id)
-            findings.extend(gcp_results)
+        writer = asyncio.create_task(self._drain_writer(scan_id))
         
-        # Azure Blobs
-        if config.get("scan_azure", True):
-            azure_results = await self._scan_azure(name, domain, scan_id)
-            findings.extend(azure_results)
+        try:
+            results = await asyncio.gather(
+                *[scan(name, domain, scan_id, config) for enabled, scan in providers if enabled],
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"Cloud provider scan failed: {result}")
+                    continue
+                findings.extend(result)
+        finally:
+            # Let queued findings reach the database before returning
+            await self._vuln_queue.join()
+            writer.cancel()
+            await self.close()
         
         logger.info(f"Cloud recon found {len(findings)} resources")
         
@@ -63,27 +210,50 @@ class CloudRecon:
             "resources": findings
         }
     
-    async def _scan_s3(self, name: str, domain: str, scan_id: str) -> List[Dict]:
+    @staticmethod
+    def _candidate_buckets(name: str, domain: str) -> Iterator[str]:
+        """Yield bucket name candidates, most likely first"""
+        label = domain.split(".")[0]
+        bases = list(dict.fromkeys([name, label, domain.replace(".", ""), domain]))
+        
+        # Score every base/separator/token combination: frequent tokens,
+        # the plain hyphen form and the primary bases come out first
+        queue = [(0, i, base) for i, base in enumerate(bases)]
+        for rank, token in enumerate(BUCKET_TOKENS):
+            for b, base in enumerate(bases):
+                for j, sep in enumerate(BUCKET_SEPARATORS):
+                    score = 1 + rank + 8 * b + 16 * j
+                    queue.append((score, 0, f"{base}{sep}{token}"))
+                    queue.append((score + 4, 0, f"{token}{sep}{base}"))
+        heapq.heapify(queue)
+        
+        seen: Set[str] = set()
+        while queue:
+            _, _, candidate = heapq.heappop(queue)
+            if candidate not in seen and 3 <= len(candidate) <= 63:
+                seen.add(candidate)
+                yield candidate
+    
+    async def _scan_s3(self, name: str, domain: str, scan_id: str, config: Dict[str, Any]) -> List[Dict]:
         """Scan for S3 buckets"""
         await self.tool_manager.ensure_tool("s3scanner")
         
-        # Generate bucket names
-        bucket_names = [
-            name,
-            f"{name}-assets",
-            f"{name}-data",
-            f"{name}-uploads",
-            f"{name}-backup",
-            f"{name}-dev",
-            f"{name}-staging",
-            f"{name}-prod",
-            domain.replace(".", ""),
-            f"com-{name}"
-        ]
+        max_candidates = config.get("max_candidates", self.DEFAULT_MAX_CANDIDATES)
+        bucket_names = islice(self._candidate_buckets(name, domain), max_candidates)
         
-        findings = []
+        # Bucket checks are independent subprocess + network round trips
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+        results = await asyncio.gather(
+            *[self._check_one_s3(bucket, scan_id, sem) for bucket in bucket_names],
+            return_exceptions=True
+        )
         
-        for bucket in bucket_names:
+        return [r for r in results if isinstance(r, dict)]
+    
+    async def _check_one_s3(self, bucket: str, scan_id: str,
+                            sem: asyncio.Semaphore) -> Optional[Dict]:
+        """Check a single S3 bucket candidate"""
+        async with sem:
             try:
                 # Check with s3scanner
                 cmd = f"s3scanner scan -b {bucket}"
@@ -100,34 +270,52 @@ class CloudRecon:
                         "severity": "high" if "public" in perms else "medium"
                     }
                     
-                    findings.append(finding)
-                    
-                    # Save vulnerability
-                    await self.db.add_vulnerability(scan_id, {
+                    # Queue vulnerability for the background writer
+                    self._vuln_queue.put_nowait({
                         "title": f"Exposed S3 Bucket: {bucket}",
                         "severity": finding["severity"],
                         "description": f"S3 bucket found with permissions: {perms}",
                         "affected_url": f"s3://{bucket}",
                         "tool_source": "cloud_recon"
                     })
+                    
+                    return finding
             
             except Exception as e:
                 logger.debug(f"S3 check failed for {bucket}: {e}")
         
-        return findings
+        return None
+    
+    def _get_s3_client(self):
+        """Get the shared S3 client, creating it on first use"""
+        if self._s3_client is None:
+            self._s3_client = boto3.client(
+                's3',
+                config=BotoConfig(
+                    retries={'max_attempts': 2},
+                    max_pool_connections=self.MAX_CONCURRENT_CHECKS
+                )
+            )
+        return self._s3_client
     
     async def _check_s3_perms(self, bucket: str) -> str:
         """Check S3 bucket permissions"""
-        import boto3
-        from botocore.exceptions import ClientError
+        if boto3 is None:
+            return "unknown"
         
         try:
-            s3 = boto3.client('s3')
+            s3 = self._get_s3_client()
             
-            # Try to list bucket
-            s3.list_objects_v2(Bucket=bucket, MaxKeys=1)
+            # Try to list bucket; boto3 blocks, so run it off the event loop
+            await asyncio.wait_for(
+                asyncio.to_thread(s3.list_objects_v2, Bucket=bucket, MaxKeys=1),
+                timeout=self.S3_PERMS_TIMEOUT
+            )
             return "listable"
         
+        except asyncio.TimeoutError:
+            logger.debug(f"S3 permission check timed out for {bucket}")
+        
         except ClientError as e:
             error_code = e.response['Error']['Code']
             if error_code == 'AccessDenied':
@@ -137,52 +325,61 @@ class CloudRecon:
         
         return "unknown"
     
-    async def _scan_gcp(self, name: str, domain: str, scan_id: str) -> List[Dict]:
+    async def _scan_gcp(self, name: str, domain: str, scan_id: str, config: Dict[str, Any]) -> List[Dict]:
         """Scan for GCP buckets"""
-        bucket_names = [
-            f"{name}.appspot.com",
-            f"{name}_bucket",
-            f"{name}-storage"
-        ]
+        max_candidates = config.get("max_candidates", self.DEFAULT_MAX_CANDIDATES)
+        bucket_names = [f"{name}.appspot.com", f"{name}_bucket"]
+        bucket_names.extend(islice(self._candidate_buckets(name, domain), max_candidates))
         
-        findings = []
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
         
-        async with aiohttp.ClientSession() as session:
-            for bucket in bucket_names:
-                url = f"https://storage.googleapis.com/{bucket}"
-                
-                try:
-                    async with session.get(url, timeout=10) as resp:
-                        if resp.status == 200:
-                            findings.append({
-                                "service": "gcp",
-                                "resource": f"gs://{bucket}",
-                                "status": "public",
-                                "severity": "high"
-                            })
-                            
-                            await self.db.add_vulnerability(scan_id, {
-                                "title": f"Exposed GCS Bucket: {bucket}",
-                                "severity": "high",
-                                "description": "Publicly accessible Google Cloud Storage bucket",
-                                "affected_url": url,
-                                "tool_source": "cloud_recon"
-                            })
+        session = self._get_session()
+        results = await asyncio.gather(
+            *[self._check_one_gcp(session, bucket, scan_id, sem) for bucket in bucket_names],
+            return_exceptions=True
+        )
+        
+        return [r for r in results if isinstance(r, dict)]
+    
+    async def _check_one_gcp(self, session: aiohttp.ClientSession, bucket: str,
+                             scan_id: str, sem: asyncio.Semaphore) -> Optional[Dict]:
+        """Check a single GCS bucket candidate"""
+        url = f"https://storage.googleapis.com/{bucket}"
+        
+        async with sem:
+            try:
+                async with self._request(session, "HEAD", url, allow_redirects=False,
+                                         timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                    if resp.status == 200:
+                        self._vuln_queue.put_nowait({
+                            "title": f"Exposed GCS Bucket: {bucket}",
+                            "severity": "high",
+                            "description": "Publicly accessible Google Cloud Storage bucket",
+                            "affected_url": url,
+                            "tool_source": "cloud_recon"
+                        })
                         
-                        elif resp.status == 403:
-                            findings.append({
-                                "service": "gcp",
-                                "resource": f"gs://{bucket}",
-                                "status": "exists_private",
-                                "severity": "low"
-                            })
-                
-                except Exception as e:
-                    logger.debug(f"GCP check failed for {bucket}: {e}")
+                        return {
+                            "service": "gcp",
+                            "resource": f"gs://{bucket}",
+                            "status": "public",
+                            "severity": "high"
+                        }
+                    
+                    elif resp.status == 403:
+                        return {
+                            "service": "gcp",
+                            "resource": f"gs://{bucket}",
+                            "status": "exists_private",
+                            "severity": "low"
+                        }
+            
+            except Exception as e:
+                logger.debug(f"GCP check failed for {bucket}: {e}")
         
-        return findings
+        return None
     
-    async def _scan_azure(self, name: str, domain: str, scan_id: str) -> List[Dict]:
+    async def _scan_azure(self, name: str, domain: str, scan_id: str, config: Dict[str, Any]) -> List[Dict]:
         """Scan for Azure blobs"""
         container_names = [
             name,
@@ -192,8 +389,6 @@ class CloudRecon:
             "assets"
         ]
         
-        findings = []
-        
         # Common Azure storage account patterns
         account_patterns = [
             f"{name}blob",
@@ -202,34 +397,58 @@ class CloudRecon:
             name.replace(".", "")
         ]
         
-        async with aiohttp.ClientSession() as session:
-            for account in account_patterns[:3]:
-                for container in container_names[:3]:
-                    url = f"https://{account}.blob.core.windows.net/{container}"
-                    
-                    try:
-                        async with session.get(url, timeout=10) as resp:
-                            if resp.status == 200:
-                                findings.append({
-                                    "service": "azure",
-                                    "resource": url,
-                                    "status": "public",
-                                    "severity": "high"
-                                })
-                                
-                                await self.db.add_vulnerability(scan_id, {
-                                    "title": f"Exposed Azure Blob: {account}/{container}",
-                                    "severity": "high",
-                                    "description": "Publicly accessible Azure blob container",
-                                    "affected_url": url,
-                                    "tool_source": "cloud_recon"
-                                })
-                            
-                            elif "ContainerNotFound" not in await resp.text():
-                                # Container exists but might be private
-                                pass
-                    
-                    except Exception as e:
-                        logger.debug(f"Azure check failed: {e}")
+        # Resolve each storage account host once up front; accounts that do
+        # not exist have no DNS record and need no container probes
+        accounts = account_patterns[:3]
+        resolver = self._get_resolver()
+        resolved = await asyncio.gather(
+            *[resolver.resolve(f"{account}.blob.core.windows.net", 443) for account in accounts],
+            return_exceptions=True
+        )
+        accounts = [a for a, r in zip(accounts, resolved) if not isinstance(r, Exception)]
+        
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_CHECKS)
+        
+        # Accounts x containers collapse into one batch of probes
+        session = self._get_session()
+        results = await asyncio.gather(
+            *[
+                self._check_one_azure(session, account, container, scan_id, sem)
+                for account in accounts
+                for container in container_names[:3]
+            ],
+            return_exceptions=True
+        )
+        
+        return [r for r in results if isinstance(r, dict)]
+    
+    async def _check_one_azure(self, session: aiohttp.ClientSession, account: str,
+                               container: str, scan_id: str,
+                               sem: asyncio.Semaphore) -> Optional[Dict]:
+        """Check a single Azure blob container candidate"""
+        url = f"https://{account}.blob.core.windows.net/{container}"
+        
+        async with sem:
+            try:
+                async with self._request(session, "HEAD", url, allow_redirects=False,
+                                         timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                    if resp.status == 200:
+                        self._vuln_queue.put_nowait({
+                            "title": f"Exposed Azure Blob: {account}/{container}",
+                            "severity": "high",
+                            "description": "Publicly accessible Azure blob container",
+                            "affected_url": url,
+                            "tool_source": "cloud_recon"
+                        })
+                        
+                        return {
+                            "service": "azure",
+                            "resource": url,
+                            "status": "public",
+                            "severity": "high"
+                        }
+            
+            except Exception as e:
+                logger.debug(f"Azure check failed: {e}")
         
-        return findings
+        return None
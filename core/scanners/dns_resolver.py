@@ -3,11 +3,18 @@ DNS Resolver Scanner
 Resolves subdomains to IPs using dnsx and massdns
 """
 
-import json
 import logging
-from typing import Dict, List, Any, Optional
+import random
+import string
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import aiodns
+except ImportError:  # Optional: in-process DNS queries for wildcard probes
+    aiodns = None
 
 from api.database import DatabaseManager
+from core import fast_json
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -46,19 +53,15 @@ class DNSResolver:
         # Resolve using dnsx
         resolved = await self._resolve_dnsx(subdomain_names)
         
-        # Update database with IP addresses
-        updated_count = 0
-        for sub_name, ip_list in resolved.items():
-            # Find and update subdomain record
-            for sub_data in subdomains:
-                if sub_data["subdomain"] == sub_name:
-                    # Update in database
-                    await self._update_subdomain_ip(scan_id, sub_name, ip_list)
-                    updated_count += 1
-                    break
+        # Update database with IP addresses for known subdomains in one batch
+        known = set(subdomain_names)
+        updates = [(sub_name, ips) for sub_name, ips in resolved.items() if sub_name in known]
+        await self._update_subdomain_ips(scan_id, updates)
+        updated_count = len(updates)
         
-        # Wildcard detection
-        wildcards = await self._detect_wildcards(domain=subdomain_names[0].split('.')[-2] + '.' + subdomain_names[0].split('.')[-1])
+        # Wildcard detection against the target's own domain
+        domain = await self.db.get_target_domain(target_id)
+        wildcards = await self._detect_wildcards(domain) if domain else []
         
         logger.info(f"Resolved {updated_count} subdomains")
         
@@ -72,70 +75,62 @@ class DNSResolver:
         """Resolve subdomains using dnsx"""
         await self.tool_manager.ensure_tool("dnsx")
         
-        import tempfile
-        import os
+        cmd = "dnsx -a -aaaa -silent -json"
+        
+        # Feed hosts on stdin and parse records as dnsx emits them
+        results = {}
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=300, input_data="\n".join(subdomains)):
+            if not line:
+                continue
+            try:
+                data = fast_json.loads(line)
+                host = data.get("host", "")
+                ips = []
+                
+                # Collect A and AAAA records
+                if "a" in data:
+                    ips.extend(data["a"])
+                if "aaaa" in data:
+                    ips.extend(data["aaaa"])
+                
+                if host and ips:
+                    results[host] = ips
+                    
+            except fast_json.JSONDecodeError:
+                pass
         
-        # Write subdomains to temp file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            for sub in subdomains:
-                f.write(sub + '\n')
-            temp_file = f.name
+        return results
+    
+    async def _update_subdomain_ips(self, scan_id: str, updates: List[Tuple[str, List[str]]]):
+        """Update subdomain records with their IP addresses"""
+        if not updates:
+            return
         
+        # A failed write must not lose the resolutions port_scan depends on
         try:
-            cmd = f"dnsx -l {temp_file} -a -aaaa -silent -json"
-            
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
-            
-            results = {}
-            for line in stdout.strip().split('\n'):
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                    host = data.get("host", "")
-                    ips = []
-                    
-                    # Collect A and AAAA records
-                    if "a" in data:
-                        ips.extend(data["a"])
-                    if "aaaa" in data:
-                        ips.extend(data["aaaa"])
-                    
-                    if host and ips:
-                        results[host] = ips
-                        
-                except json.JSONDecodeError:
-                    pass
-            
-            return results
-            
-        finally:
-            os.unlink(temp_file)
-    
-    async def _update_subdomain_ip(self, scan_id: str, subdomain: str, ips: List[str]):
-        """Update subdomain record with IP addresses"""
-        # Get existing record
-        existing = await self.db.get_subdomains(scan_id)
-        
-        for sub in existing:
-            if sub["subdomain"] == subdomain:
-                # Update with IPs
-                await self.db._connection.execute("""
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
                     UPDATE subdomains SET ip_addresses = ? 
                     WHERE scan_id = ? AND subdomain = ?
-                """, (json.dumps(ips), scan_id, subdomain))
-                await self.db._connection.commit()
-                break
+                """, [(fast_json.dumps(ips), scan_id, subdomain) for subdomain, ips in updates])
+        except Exception as e:
+            logger.error(f"Failed to save subdomain IPs: {e}")
     
     async def _detect_wildcards(self, domain: str) -> List[str]:
         """Detect wildcard DNS entries"""
-        import random
-        import string
-        
         # Generate random subdomain
         random_sub = ''.join(random.choices(string.ascii_lowercase, k=20))
         test_domain = f"{random_sub}.{domain}"
         
+        if aiodns is not None:
+            # A single UDP query instead of spawning dnsx for one name
+            try:
+                await aiodns.DNSResolver().query(test_domain, "A")
+            except aiodns.error.DNSError:
+                return []
+            logger.warning(f"Wildcard detected for {domain}")
+            return [domain]
+        
         await self.tool_manager.ensure_tool("dnsx")
         
         cmd = f"dnsx -d {test_domain} -a -silent"
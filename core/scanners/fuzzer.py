@@ -3,11 +3,15 @@ Web Fuzzer
 Directory and file discovery with ffuf
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import os
+import tempfile
+from typing import Dict, FrozenSet, List, Any, Optional, Set, Tuple
+from uuid import uuid4
 
 from api.database import DatabaseManager
+from core import fast_json
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 from core.wordlist_manager import WordlistManager
@@ -17,6 +21,10 @@ logger = logging.getLogger(__name__)
 class Fuzzer:
     """Web fuzzing for directories and files"""
     
+    MAX_CONCURRENT_JOBS = 8
+    # Seconds allowed per unthrottled ffuf run
+    FUZZ_TIMEOUT = 360
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -48,39 +56,57 @@ class Fuzzer:
         
         logger.info(f"Fuzzing {len(targets)} targets")
         
-        all_results = []
-        
-        for target in targets[:5]:  # Limit to first 5 to save time
-            # Directory fuzzing
-            dir_results = await self._fuzz_directories(target, config)
-            all_results.extend(dir_results)
+        # Directory and file words share one ffuf run per target, read from
+        # a single merged file written once per scan
+        wordlist, dir_words, word_count = await asyncio.to_thread(self._write_path_wordlist)
+        
+        try:
+            # Each (target, phase) pair is an independent ffuf/httpx run
+            jobs = []
+            for target in targets[:5]:  # Limit to first 5 to save time
+                if wordlist:
+                    jobs.append(self._fuzz_paths(target, config, wordlist, dir_words, word_count))
+                
+                # API endpoint fuzzing if API detected
+                if any(tech in str(target).lower() for tech in ["api", "rest", "graphql"]):
+                    jobs.append(self._fuzz_api(target, config))
             
-            # File fuzzing
-            file_results = await self._fuzz_files(target, config)
-            all_results.extend(file_results)
+            sem = asyncio.Semaphore(self.MAX_CONCURRENT_JOBS)
             
-            # API endpoint fuzzing if API detected
-            if any(tech in str(target).lower() for tech in ["api", "rest", "graphql"]):
-                api_results = await self._fuzz_api(target, config)
-                all_results.extend(api_results)
-        
-        # Save results
-        for result in all_results:
-            await self.db._connection.execute("""
-                INSERT INTO endpoints (id, scan_id, url, method, status_code, 
-                                     content_type, content_length, discovered_via)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                str(__import__('uuid').uuid4()),
-                scan_id,
-                result["url"],
-                result.get("method", "GET"),
-                result.get("status_code", 0),
-                result.get("content_type", ""),
-                result.get("content_length", 0),
-                "ffuf"
-            ))
-        await self.db._connection.commit()
+            async def bounded(job):
+                async with sem:
+                    return await job
+            
+            all_results = []
+            for results in await asyncio.gather(*[bounded(job) for job in jobs], return_exceptions=True):
+                if isinstance(results, Exception):
+                    logger.error(f"Fuzzing job failed: {results}")
+                    continue
+                all_results.extend(results)
+        finally:
+            if wordlist:
+                os.unlink(wordlist)
+        
+        # Save results in one batch
+        if all_results:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
+                    INSERT INTO endpoints (id, scan_id, url, method, status_code, 
+                                         content_type, content_length, discovered_via)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        str(uuid4()),
+                        scan_id,
+                        result["url"],
+                        result.get("method", "GET"),
+                        result.get("status_code", 0),
+                        result.get("content_type", ""),
+                        result.get("content_length", 0),
+                        "ffuf"
+                    )
+                    for result in all_results
+                ])
         
         logger.info(f"Fuzzing found {len(all_results)} endpoints")
         
@@ -90,62 +116,73 @@ class Fuzzer:
             "results": all_results
         }
     
-    async def _fuzz_directories(self, target: str, config: Dict) -> List[Dict]:
-        """Fuzz for directories"""
-        await self.tool_manager.ensure_tool("ffuf")
-        
-        wordlist = self.wordlist_mgr.get_wordlist_path("directories")
-        if not wordlist:
-            return []
-        
-        cmd = f"ffuf -u {target}/FUZZ -w {wordlist} -mc 200,301,302,403 -json -s"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=180)
-        
-        results = []
-        for line in stdout.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                data = json.loads(line)
-                results.append({
-                    "url": data.get("url", "").replace("/FUZZ", data.get("input", {}).get("FUZZ", "")),
-                    "status_code": data.get("status", 0),
-                    "content_length": data.get("length", 0),
-                    "method": "GET",
-                    "type": "directory"
-                })
-            except json.JSONDecodeError:
-                pass
-        
-        return results
+    def _write_path_wordlist(self) -> Tuple[Optional[str], FrozenSet[str], int]:
+        """Merge the directory and file wordlists into one deduplicated temp file
+        
+        Returns the file path, the words taken from the directory list and the word count
+        """
+        sources = []
+        for name in ("directories", "files"):
+            path = self.wordlist_mgr.get_wordlist_path(name)
+            if path:
+                sources.append((path, name == "directories"))
+        
+        if not sources:
+            return None, frozenset(), 0
+        
+        seen: Set[str] = set()
+        dir_words: Set[str] = set()
+        
+        # Directory words go first, so a word in both lists keeps directory semantics
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as out:
+            for path, is_dir in sources:
+                with open(path, errors="replace") as f:
+                    for line in f:
+                        word = line.rstrip("\r\n")
+                        if word and word not in seen:
+                            seen.add(word)
+                            out.write(word + "\n")
+                            if is_dir:
+                                dir_words.add(word)
+        
+        return out.name, frozenset(dir_words), len(seen)
     
-    async def _fuzz_files(self, target: str, config: Dict) -> List[Dict]:
-        """Fuzz for files"""
+    async def _fuzz_paths(self, target: str, config: Dict, wordlist: str,
+                          dir_words: FrozenSet[str], word_count: int) -> List[Dict]:
+        """Fuzz for directories and files in a single ffuf run"""
         await self.tool_manager.ensure_tool("ffuf")
         
-        wordlist = self.wordlist_mgr.get_wordlist_path("files")
-        if not wordlist:
-            return []
-        
-        cmd = f"ffuf -u {target}/FUZZ -w {wordlist} -mc 200 -json -s"
+        cmd = f"ffuf -u {target}/FUZZ -w {wordlist} -mc 200,301,302,403 -json -s"
+        timeout = self.FUZZ_TIMEOUT
         
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=180)
+        # Throttling is opt-in; give a rate-limited run time to get through the whole list
+        rate = config.get("rate")
+        if rate:
+            cmd += f" -rate {rate}"
+            timeout = max(timeout, int(word_count / rate * 1.5))
         
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=timeout):
             if not line:
                 continue
             try:
-                data = json.loads(line)
+                data = fast_json.loads(line)
+                word = data.get("input", {}).get("FUZZ", "")
+                status = data.get("status", 0)
+                
+                # Words only in the files list count when served directly
+                is_file = word not in dir_words
+                if is_file and status != 200:
+                    continue
+                
                 results.append({
-                    "url": data.get("url", "").replace("/FUZZ", data.get("input", {}).get("FUZZ", "")),
-                    "status_code": data.get("status", 0),
+                    "url": data.get("url", "").replace("/FUZZ", word),
+                    "status_code": status,
                     "content_length": data.get("length", 0),
                     "method": "GET",
-                    "type": "file"
+                    "type": "file" if is_file else "directory"
                 })
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 pass
         
         return results
@@ -155,16 +192,19 @@ class Fuzzer:
         # Common API paths
         api_paths = ["v1", "v2", "api", "rest", "graphql", "swagger", "openapi.json"]
         
+        urls = [f"{target}/{path}" for path in api_paths]
+        
+        # Quick check with a single httpx run over every path
+        cmd = "httpx -silent -status-code -no-color"
+        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=30, input_data="\n".join(urls))
+        
         results = []
-        for path in api_paths:
-            url = f"{target}/{path}"
-            # Quick check with httpx
-            cmd = f"httpx -u {url} -silent -status-code"
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=10)
-            
-            if stdout.strip() and "200" in stdout:
+        for line in stdout.splitlines():
+            # Lines look like "https://host/path [200]"
+            parts = line.split()
+            if len(parts) >= 2 and parts[1] == "[200]":
                 results.append({
-                    "url": url,
+                    "url": parts[0],
                     "status_code": 200,
                     "type": "api"
                 })
@@ -3,10 +3,11 @@ GF Pattern Analyzer
 Pattern matching for vulnerabilities in URLs
 """
 
-import json
+import asyncio
+import functools
 import logging
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Pattern, Sequence, Set, Tuple
 
 from api.database import DatabaseManager
 from core.subprocess_manager import SubprocessManager
@@ -65,6 +66,45 @@ class GFAnalyzer:
         }
     }
     
+    # Each pattern compiled once at class load, for per-pattern matching
+    COMPILED_PATTERNS = {
+        name: re.compile(info["pattern"], re.IGNORECASE)
+        for name, info in PATTERNS.items()
+    }
+    
+    # Substrings (lowercase) a URL must contain for each pattern to possibly
+    # match; cheap C-level checks that skip most regex work
+    PREFILTER = {
+        "xss": ("<", ">", "\"", "'", "%3c", "%3e", "%22", "%27"),
+        "sqli": ("union", "select", "insert", "update", "delete", "drop", "--", "#", "%23", "and", "or"),
+        "ssrf": ("url=", "path=", "dest=", "redirect=", "uri=", "src=", "next=", "continue="),
+        "lfi": ("..", "%2e%2e", "/etc/", "/var/", "/proc/", "/home/", "\\"),
+        "rce": (";", "`", "$(", "&&", "||", "wget", "curl", "sh", "cmd", "powershell"),
+        "idor": ("id=", "user=", "account=", "number=", "order=", "item=", "profile=", "doc=", "file="),
+        "debug": ("debug", "test", "dev", "staging", "admin", "internal", "local", "beta", "gamma"),
+        "api_key": ("key=", "token=", "secret=", "password=", "passwd=", "pwd=", "auth="),
+        "s3_bucket": ("s3.amazonaws.com", ".s3-", "s3://")
+    }
+    
+    # Patterns that need a "name=value" parameter in the URL
+    PARAM_PATTERNS = frozenset(
+        name for name, rx in COMPILED_PATTERNS.items() if "=" in rx.pattern
+    )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _classifier(names: Tuple[str, ...]) -> Pattern:
+        """Fuse the named patterns into one regex: each optional lookahead
+        records in its named group whether that pattern occurs anywhere in
+        the URL, so a single match() classifies a URL against all of them"""
+        return re.compile(
+            "".join(
+                f"(?=.*?(?P<{name}>{GFAnalyzer.COMPILED_PATTERNS[name].pattern}))?"
+                for name in names
+            ),
+            re.IGNORECASE | re.DOTALL
+        )
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -79,42 +119,56 @@ class GFAnalyzer:
     ) -> Dict[str, Any]:
         """Analyze URLs for vulnerability patterns"""
         
-        # Collect URLs from previous results
-        urls = []
+        # Collect URLs from previous results, deduplicating on insert
+        urls: Set[str] = set()
         
         # From HTTP probe
         http_data = previous_results.get("http_probe", {})
         for result in http_data.get("results", []):
             url = result.get("url", "")
             if url:
-                urls.append(url)
+                urls.add(url)
         
         # From fuzzing
         fuzz_data = previous_results.get("fuzzing", {})
         for result in fuzz_data.get("results", []):
             url = result.get("url", "")
             if url:
-                urls.append(url)
+                urls.add(url)
         
         # From wayback
         wayback_data = previous_results.get("wayback_urls", {})
-        for url in wayback_data.get("urls", []):
-            urls.append(url)
+        urls.update(url for url in wayback_data.get("urls", []) if url)
         
         if not urls:
             logger.warning("No URLs to analyze")
             return {"analyzed": 0, "matches": 0}
         
-        # Remove duplicates
-        urls = list(set(urls))
+        urls = tuple(urls)
         
         logger.info(f"Analyzing {len(urls)} URLs for patterns")
         
         matches = []
+        vulns = []
+        
+        prefilter = self.PREFILTER.items()
+        param_patterns = self.PARAM_PATTERNS
         
         for url in urls:
-            for pattern_name, pattern_info in self.PATTERNS.items():
-                if re.search(pattern_info["pattern"], url, re.IGNORECASE):
+            # Only run the patterns whose required substrings are present
+            url_l = url.lower()
+            has_params = "=" in url_l
+            candidates = tuple(
+                name for name, tokens in prefilter
+                if (has_params or name not in param_patterns)
+                and any(map(url_l.__contains__, tokens))
+            )
+            if not candidates:
+                continue
+            
+            for pattern_name, hit in self._classifier(candidates).match(url).groupdict().items():
+                if hit is not None:
+                    pattern_info = self.PATTERNS[pattern_name]
                     matches.append({
                         "url": url,
                         "pattern": pattern_name,
@@ -122,8 +176,8 @@ class GFAnalyzer:
                         "description": pattern_info["description"]
                     })
                     
-                    # Save to database as potential vulnerability
-                    await self.db.add_vulnerability(scan_id, {
+                    # Queue as potential vulnerability
+                    vulns.append({
                         "title": f"Potential {pattern_name.upper()} - Pattern Match",
                         "severity": pattern_info["severity"],
                         "description": pattern_info["description"],
@@ -132,6 +186,9 @@ class GFAnalyzer:
                         "false_positive": True  # Mark as potential FP until verified
                     })
         
+        # Save all pattern matches in one batch
+        await self.db.add_vulnerabilities(scan_id, vulns)
+        
         # Try to use gf tool if available
         try:
             await self.tool_manager.ensure_tool("gf")
@@ -148,34 +205,33 @@ class GFAnalyzer:
             "patterns_found": matches
         }
     
-    async def _run_gf_tool(self, urls: List[str]) -> List[Dict]:
+    async def _run_gf_tool(self, urls: Sequence[str]) -> List[Dict]:
         """Run gf tool for pattern matching"""
-        import tempfile
-        import os
-        
-        # Write URLs to temp file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            for url in urls:
-                f.write(url + '\n')
-            temp_file = f.name
+        patterns = ["xss", "sqli", "ssrf", "lfi", "rce"]
+        url_input = "\n".join(urls) + "\n"
+        
+        # One gf process per pattern, all fed the URL list on stdin concurrently
+        outputs = await asyncio.gather(
+            *[
+                self.subprocess_mgr.run_simple(f"gf {pattern}", timeout=60, input_data=url_input)
+                for pattern in patterns
+            ],
+            return_exceptions=True
+        )
         
         matches = []
         
-        try:
-            for pattern in ["xss", "sqli", "ssrf", "lfi", "rce"]:
-                cmd = f"cat {temp_file} | gf {pattern}"
-                
-                stdout = await self.subprocess_mgr.run_simple(cmd, timeout=60)
-                
-                for line in stdout.strip().split('\n'):
-                    if line:
-                        matches.append({
-                            "url": line,
-                            "pattern": pattern,
-                            "source": "gf"
-                        })
-        
-        finally:
-            os.unlink(temp_file)
+        for pattern, stdout in zip(patterns, outputs):
+            if isinstance(stdout, Exception):
+                logger.debug(f"gf {pattern} failed: {stdout}")
+                continue
+            
+            for line in stdout.splitlines():
+                if line:
+                    matches.append({
+                        "url": line,
+                        "pattern": pattern,
+                        "source": "gf"
+                    })
         
         return matches
@@ -3,14 +3,18 @@ Git Reconnaissance Scanner
 Detect and dump exposed .git directories
 """
 
+import asyncio
 import logging
 import re
-from typing import Dict, List, Any, Optional
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
 from urllib.parse import urljoin
 
 import aiohttp
 
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -52,39 +56,47 @@ class GitRecon:
         
         exposed_repos = []
         
-        async with aiohttp.ClientSession() as session:
-            for host in live_hosts[:10]:  # Limit to first 10
-                base_url = host.get("url", "")
-                if not base_url:
-                    continue
-                
-                # Check for exposed .git
-                is_exposed = await self._check_git_exposure(session, base_url)
-                
-                if is_exposed:
-                    logger.warning(f"Exposed .git found at {base_url}")
-                    
-                    exposed_repos.append({
-                        "url": base_url,
-                        "severity": "critical"
-                    })
-                    
-                    # Try to dump if enabled
-                    if config.get("dump_git", False):
-                        await self._dump_git(base_url, scan_id)
-                    
-                    # Add vulnerability
-                    await self.db.add_vulnerability(scan_id, {
-                        "title": "Exposed Git Repository",
-                        "severity": "critical",
-                        "description": f"Git repository exposed at {base_url}/.git/",
-                        "affected_url": f"{base_url}/.git/",
-                        "tool_source": "git_recon"
-                    })
-                    
-                    # Search for secrets in git
-                    if config.get("scan_secrets", True):
-                        await self._scan_git_secrets(base_url, scan_id)
+        # Probe every host concurrently; only exposed ones need follow-up work
+        sem = asyncio.Semaphore(config.get("git_concurrency", 50))
+        base_urls = [h["url"] for h in live_hosts[:config.get("max_hosts")] if h.get("url")]
+        
+        session = await get_session()
+        results = await asyncio.gather(
+            *[self._check_git_exposure(session, base_url, sem) for base_url in base_urls],
+            return_exceptions=True
+        )
+        
+        for result in results:
+            if isinstance(result, Exception):
+                continue
+            
+            base_url, is_exposed = result
+            if not is_exposed:
+                continue
+            
+            logger.warning(f"Exposed .git found at {base_url}")
+            
+            exposed_repos.append({
+                "url": base_url,
+                "severity": "critical"
+            })
+            
+            # Try to dump if enabled
+            if config.get("dump_git", False):
+                await self._dump_git(base_url, scan_id)
+            
+            # Add vulnerability
+            await self.db.add_vulnerability(scan_id, {
+                "title": "Exposed Git Repository",
+                "severity": "critical",
+                "description": f"Git repository exposed at {base_url}/.git/",
+                "affected_url": f"{base_url}/.git/",
+                "tool_source": "git_recon"
+            })
+            
+            # Search for secrets in git
+            if config.get("scan_secrets", True):
+                await self._scan_git_secrets(base_url, scan_id)
         
         logger.info(f"Found {len(exposed_repos)} exposed Git repositories")
         
@@ -95,29 +107,27 @@ class GitRecon:
         }
     
     async def _check_git_exposure(self, session: aiohttp.ClientSession, 
-                                   base_url: str) -> bool:
+                                   base_url: str, sem: asyncio.Semaphore) -> Tuple[str, bool]:
         """Check if .git is exposed"""
         test_url = urljoin(base_url, ".git/HEAD")
         
-        try:
-            async with session.get(test_url, timeout=10) as resp:
-                if resp.status == 200:
-                    content = await resp.text()
-                    # Check if it's a valid git HEAD
-                    if content.startswith("ref:") or "commit" in content:
-                        return True
-        except Exception:
-            pass
+        async with sem:
+            try:
+                async with session.get(test_url, timeout=10) as resp:
+                    if resp.status == 200:
+                        content = await resp.text()
+                        # Check if it's a valid git HEAD
+                        if content.startswith("ref:") or "commit" in content:
+                            return base_url, True
+            except Exception:
+                pass
         
-        return False
+        return base_url, False
     
     async def _dump_git(self, base_url: str, scan_id: str):
         """Dump exposed git repository"""
         await self.tool_manager.ensure_tool("git-dumper")
         
-        import os
-        from pathlib import Path
-        
         dump_dir = Path(f"data/cache/git_dumps/{scan_id}")
         dump_dir.mkdir(parents=True, exist_ok=True)
         
@@ -146,19 +156,19 @@ class GitRecon:
             # Parse results if file exists
             results_file = repo_path / "gitleaks.json"
             if results_file.exists():
-                import json
-                with open(results_file) as f:
-                    leaks = json.load(f)
+                leaks = fast_json.loads(results_file.read_bytes())
                 
-                for leak in leaks:
-                    await self.db.add_vulnerability(scan_id, {
+                await self.db.add_vulnerabilities(scan_id, [
+                    {
                         "title": f"Git Secret: {leak.get('RuleID', 'Unknown')}",
                         "severity": "critical",
                         "description": f"Secret found in git history: {leak.get('Description', '')}",
                         "affected_url": source_url,
                         "evidence": leak.get('Match', ''),
                         "tool_source": "gitleaks"
-                    })
+                    }
+                    for leak in leaks
+                ])
         
         except Exception as e:
             logger.error(f"Gitleaks scan failed: {e}")
@@ -170,16 +180,15 @@ class GitRecon:
             
             cmd = f"trufflehog git {base_url}/.git --json"
             
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
-            
-            for line in stdout.strip().split('\n'):
+            # Parse findings as trufflehog emits them
+            vulns = []
+            async for line in self.subprocess_mgr.run_stream(cmd, timeout=300):
                 if not line:
                     continue
                 try:
-                    import json
-                    finding = json.loads(line)
+                    finding = fast_json.loads(line)
                     
-                    await self.db.add_vulnerability(scan_id, {
+                    vulns.append({
                         "title": f"TruffleHog: {finding.get('DetectorName', 'Secret')}",
                         "severity": "critical",
                         "description": f"Secret detected in git repository",
@@ -187,8 +196,11 @@ class GitRecon:
                         "evidence": finding.get('Redacted', ''),
                         "tool_source": "trufflehog"
                     })
-                except json.JSONDecodeError:
+                except fast_json.JSONDecodeError:
                     pass
+            
+            # Save all findings in one batch
+            await self.db.add_vulnerabilities(scan_id, vulns)
         
         except Exception as e:
             logger.error(f"TruffleHog scan failed: {e}")
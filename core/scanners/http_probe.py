@@ -3,11 +3,20 @@ HTTP Prober
 HTTP/HTTPS probing with httpx for live host detection
 """
 
-import json
+import asyncio
+import html
 import logging
+import os
+import re
+import tempfile
 from typing import Dict, List, Any, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
 
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session, prefetch_dns
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -16,6 +25,12 @@ logger = logging.getLogger(__name__)
 class HTTPProber:
     """HTTP/HTTPS probing and technology detection"""
     
+    # Matches the shared session's connection limit
+    MAX_CONCURRENT_PROBES = 256
+    # Bytes of body read when looking for a <title>
+    TITLE_READ_BYTES = 8192
+    TITLE_PATTERN = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -43,6 +58,9 @@ class HTTPProber:
         # Prepare target list
         targets = [s["subdomain"] for s in subdomains]
         
+        # Warm the shared DNS cache in the background; probes join in-flight lookups
+        prefetch = asyncio.create_task(prefetch_dns(targets))
+        
         # Also add IPs from port scan if available
         port_data = previous_results.get("port_scan", {})
         for ip, ports in port_data.get("results", {}).items():
@@ -53,15 +71,21 @@ class HTTPProber:
                     else:
                         targets.append(f"http://{ip}:{port_info['port']}")
         
-        # Run httpx
-        results = await self._run_httpx(targets, config)
+        # Probe in-process unless the external httpx binary is requested. Native
+        # probes only report X-Powered-By as tech; set tech_detect (or
+        # use_external_httpx) to run the whole probe through httpx -tech-detect
+        # for Wappalyzer fingerprints
+        if config.get("use_external_httpx", False) or config.get("tech_detect", False):
+            results = await self._run_httpx(targets, config)
+        else:
+            results = await self._probe_native(targets, config)
+        
+        await prefetch
         
         # Update database
-        live_count = 0
-        for result in results:
-            if result.get("status_code", 0) > 0:
-                live_count += 1
-                await self._update_subdomain(scan_id, result)
+        live = [r for r in results if r.get("status_code", 0) > 0]
+        live_count = len(live)
+        await self._update_subdomains(scan_id, live)
         
         logger.info(f"Found {live_count} live hosts")
         
@@ -71,13 +95,72 @@ class HTTPProber:
             "results": results
         }
     
+    async def _probe_native(self, targets: List[str], config: Dict) -> List[Dict]:
+        """Probe targets concurrently with aiohttp"""
+        session = await get_session()
+        sem = asyncio.Semaphore(config.get("concurrency", self.MAX_CONCURRENT_PROBES))
+        timeout = aiohttp.ClientTimeout(total=config.get("timeout", 10))
+        follow_redirects = config.get("follow_redirects", True)
+        
+        async def probe(target: str) -> Optional[Dict]:
+            # Bare hosts are tried over HTTPS first, then HTTP, like httpx
+            if "://" in target:
+                urls = [target]
+            else:
+                urls = [f"https://{target}", f"http://{target}"]
+            
+            async with sem:
+                for url in urls:
+                    result = await self._probe_url(session, url, timeout, follow_redirects)
+                    if result:
+                        return result
+            return None
+        
+        results = await asyncio.gather(*[probe(t) for t in targets], return_exceptions=True)
+        return [r for r in results if r and not isinstance(r, Exception)]
+    
+    async def _probe_url(self, session: aiohttp.ClientSession, url: str,
+                         timeout: aiohttp.ClientTimeout, follow_redirects: bool) -> Optional[Dict]:
+        """Fetch a single URL and extract httpx-style fields"""
+        try:
+            async with session.get(url, allow_redirects=follow_redirects,
+                                   timeout=timeout, ssl=False) as resp:
+                head = await resp.content.read(self.TITLE_READ_BYTES)
+                
+                title = ""
+                match = self.TITLE_PATTERN.search(head)
+                if match:
+                    try:
+                        raw_title = match.group(1).decode(resp.charset or "utf-8", errors="replace")
+                    except LookupError:
+                        raw_title = match.group(1).decode("utf-8", errors="replace")
+                    title = html.unescape(raw_title).strip()
+                
+                try:
+                    content_length = int(resp.headers.get("Content-Length", ""))
+                except ValueError:
+                    content_length = len(head)
+                
+                powered_by = resp.headers.get("X-Powered-By")
+                
+                return {
+                    "url": url,
+                    "status_code": resp.status,
+                    "title": title,
+                    "tech": [powered_by] if powered_by else [],
+                    "content_length": content_length,
+                    "webserver": resp.headers.get("Server", ""),
+                    "location": resp.headers.get("Location", ""),
+                    "host": urlsplit(url).hostname or ""
+                }
+        except Exception as e:
+            logger.debug(f"Probe failed for {url}: {e}")
+            return None
+    
     async def _run_httpx(self, targets: List[str], config: Dict) -> List[Dict]:
         """Run httpx on targets"""
         await self.tool_manager.ensure_tool("httpx")
         
-        import tempfile
-        import os
-        
         # Write targets to temp file
         with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
             for target in targets:
@@ -107,14 +190,13 @@ class HTTPProber:
             
             cmd = f"httpx {' '.join(flags)}"
             
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=600)
-            
+            # Parse results as httpx emits them
             results = []
-            for line in stdout.strip().split('\n'):
+            async for line in self.subprocess_mgr.run_stream(cmd, timeout=600):
                 if not line:
                     continue
                 try:
-                    data = json.loads(line)
+                    data = fast_json.loads(line)
                     results.append({
                         "url": data.get("url", ""),
                         "status_code": data.get("status_code", 0),
@@ -125,7 +207,7 @@ class HTTPProber:
                         "location": data.get("location", ""),
                         "host": data.get("host", "")
                     })
-                except json.JSONDecodeError:
+                except fast_json.JSONDecodeError:
                     pass
             
             return results
@@ -133,18 +215,27 @@ class HTTPProber:
         finally:
             os.unlink(temp_file)
     
-    async def _update_subdomain(self, scan_id: str, result: Dict):
-        """Update subdomain with HTTP info"""
-        host = result.get("host", "")
-        if not host:
+    async def _update_subdomains(self, scan_id: str, results: List[Dict]):
+        """Update subdomains with HTTP info"""
+        rows = [
+            (
+                result.get("status_code"),
+                result.get("title"),
+                fast_json.dumps(result.get("tech", [])),
+                True,
+                fast_json.dumps({"content_length": result.get("content_length")}),
+                scan_id,
+                result["host"]
+            )
+            for result in results if result.get("host")
+        ]
+        if not rows:
             return
         
-        # Find and update subdomain
-        subdomains = await self.db.get_subdomains(scan_id)
-        
-        for sub in subdomains:
-            if sub["subdomain"] == host:
-                await self.db._connection.execute("""
+        # Downstream modules read live hosts from the results, not the table
+        try:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
                     UPDATE subdomains SET 
                         status_code = ?,
                         title = ?,
@@ -152,14 +243,6 @@ class HTTPProber:
                         is_live = ?,
                         headers = ?
                     WHERE scan_id = ? AND subdomain = ?
-                """, (
-                    result.get("status_code"),
-                    result.get("title"),
-                    json.dumps(result.get("tech", [])),
-                    True,
-                    json.dumps({"content_length": result.get("content_length")}),
-                    scan_id,
-                    host
-                ))
-                await self.db._connection.commit()
-                break
+                """, rows)
+        except Exception as e:
+            logger.error(f"Failed to save HTTP probe results: {e}")
@@ -3,22 +3,55 @@ JavaScript Analyzer
 Extract secrets, endpoints, and analyze JS files
 """
 
-import json
+import asyncio
 import logging
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from urllib.parse import urljoin, urlparse
+from uuid import uuid4
 
 import aiohttp
 
+try:
+    import ahocorasick
+except ImportError:  # Optional: one-pass multi-literal prefilter for secrets
+    ahocorasick = None
+
 from api.database import DatabaseManager
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 
 logger = logging.getLogger(__name__)
 
+def _build_literal_automaton(literals: Dict[str, Tuple[str, ...]]):
+    """Build an Aho-Corasick automaton mapping each literal to the
+    pattern names that require it, or None without pyahocorasick"""
+    if ahocorasick is None:
+        return None
+    
+    owners: Dict[str, List[str]] = {}
+    for name, words in literals.items():
+        for word in words:
+            owners.setdefault(word, []).append(name)
+    
+    automaton = ahocorasick.Automaton()
+    for word, names in owners.items():
+        automaton.add_word(word, tuple(names))
+    automaton.make_automaton()
+    return automaton
+
 class JSAnalyzer:
     """JavaScript file analysis"""
     
+    MAX_CONCURRENT_DOWNLOADS = 100
+    MAX_JS_BYTES = 2 * 1024 * 1024
+    
+    # HEAD statuses worth a GET; 405/501 mean the server just refuses HEAD
+    PREFLIGHT_OK = {200, 405, 501}
+    
+    # Content-Type fragments a JS response may carry; anything else is skipped
+    JS_CONTENT_TYPES = ("javascript", "ecmascript", "text/plain", "application/octet-stream")
+    
     SECRET_PATTERNS = {
         "aws_access_key": r"AKIA[0-9A-Z]{16}",
         "aws_secret_key": r"[0-9a-zA-Z/+]{40}",
@@ -42,9 +75,37 @@ class JSAnalyzer:
         r"url:\s*['\"]([^'\"]+)['\"]"
     ]
     
+    # Compiled once at class load with their flags baked in
+    COMPILED_SECRETS = {
+        secret_type: re.compile(pattern, re.IGNORECASE)
+        for secret_type, pattern in SECRET_PATTERNS.items()
+    }
+    COMPILED_ENDPOINTS = [re.compile(pattern) for pattern in ENDPOINT_PATTERNS]
+    SOURCE_MAP_PATTERN = re.compile(r'//# sourceMappingURL=(.+)$', re.MULTILINE)
+    
+    # Literals a file must contain (lowercased) before a secret pattern can
+    # match; patterns without an entry always run
+    SECRET_LITERALS = {
+        "aws_access_key": ("akia",),
+        "google_api_key": ("aiza",),
+        "github_token": ("ghp_", "gho_", "ghu_", "ghs_", "ghr_"),
+        "slack_token": ("xoxb-", "xoxa-", "xoxp-", "xoxr-", "xoxs-"),
+        "private_key": ("private key-----",),
+        "jwt_token": ("eyj",),
+        "api_key_generic": ("apikey", "api_key", "api-key"),
+        "password": ("password", "passwd", "pwd"),
+        "secret": ("secret", "token")
+    }
+    SECRET_AUTOMATON = _build_literal_automaton(SECRET_LITERALS)
+    
+    # Case-sensitive literals required by each endpoint pattern, in order
+    ENDPOINT_LITERALS = ["/api/", "/v", "http", "fetch(", "axios.", ".ajax({", "url:"]
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
+        # Source map existence probes, shared by files referencing the same map
+        self._source_map_probes: Dict[str, asyncio.Task] = {}
     
     async def scan(
         self,
@@ -89,55 +150,65 @@ class JSAnalyzer:
         
         all_secrets = []
         all_endpoints = []
+        # Resolved endpoint URLs already recorded, shared across all files
+        seen_endpoints: Set[str] = set()
+        self._source_map_probes.clear()
         
-        # Download and analyze JS files
-        async with aiohttp.ClientSession() as session:
-            for js_url in js_urls[:20]:  # Limit to 20 files
-                try:
-                    content = await self._download_js(session, js_url)
-                    if not content:
-                        continue
-                    
-                    # Find secrets
-                    secrets = self._find_secrets(content, js_url)
-                    all_secrets.extend(secrets)
-                    
-                    # Find endpoints
-                    endpoints = self._find_endpoints(content, js_url)
-                    all_endpoints.extend(endpoints)
-                    
-                    # Check for source maps
-                    source_map = await self._check_source_map(session, js_url, content)
-                    if source_map:
-                        logger.info(f"Found source map for {js_url}")
-                    
-                except Exception as e:
-                    logger.debug(f"Failed to analyze {js_url}: {e}")
+        session = await get_session()
+        sem = asyncio.Semaphore(self.MAX_CONCURRENT_DOWNLOADS)
+        max_bytes = config.get("max_js_bytes", self.MAX_JS_BYTES)
+        
+        # Cheap HEAD preflight so only files that exist and fit get downloaded
+        probes = await asyncio.gather(
+            *[self._head_probe(session, js_url, sem) for js_url in js_urls],
+            return_exceptions=True
+        )
+        js_urls = [
+            url for url, status, length in (p for p in probes if not isinstance(p, Exception))
+            if status in self.PREFLIGHT_OK and (length is None or length <= max_bytes)
+        ][:20]  # Limit to 20 files
         
-        # Save secrets as vulnerabilities
-        for secret in all_secrets:
-            await self.db.add_vulnerability(scan_id, {
+        # Download and analyze JS files concurrently
+        results = await asyncio.gather(
+            *[self._fetch_and_scan(session, js_url, sem, max_bytes, seen_endpoints)
+              for js_url in js_urls],
+            return_exceptions=True
+        )
+        
+        for js_url, result in zip(js_urls, results):
+            if isinstance(result, Exception):
+                logger.debug(f"Failed to analyze {js_url}: {result}")
+                continue
+            
+            secrets, endpoints, source_map = result
+            all_secrets.extend(secrets)
+            all_endpoints.extend(endpoints)
+            if source_map:
+                logger.info(f"Found source map for {js_url}")
+        
+        # Save secrets as vulnerabilities in one batch
+        await self.db.add_vulnerabilities(scan_id, [
+            {
                 "title": f"Hardcoded {secret['type']} in JavaScript",
                 "severity": "critical",
                 "description": f"Found potential {secret['type']} in {secret['file']}",
                 "affected_url": secret["file"],
                 "evidence": f"Pattern match: {secret['pattern'][:50]}...",
                 "tool_source": "js_analyzer"
-            })
-        
-        # Save endpoints
-        for endpoint in all_endpoints:
-            await self.db._connection.execute("""
-                INSERT INTO endpoints (id, scan_id, url, method, discovered_via)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                str(__import__('uuid').uuid4()),
-                scan_id,
-                endpoint["url"],
-                "GET",
-                "js_analyzer"
-            ))
-        await self.db._connection.commit()
+            }
+            for secret in all_secrets
+        ])
+        
+        # Save endpoints in one batch
+        if all_endpoints:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
+                    INSERT INTO endpoints (id, scan_id, url, method, discovered_via)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (str(uuid4()), scan_id, endpoint["url"], "GET", "js_analyzer")
+                    for endpoint in all_endpoints
+                ])
         
         logger.info(f"JS analysis: {len(all_secrets)} secrets, {len(all_endpoints)} endpoints")
         
@@ -149,15 +220,70 @@ class JSAnalyzer:
             "endpoint_findings": all_endpoints
         }
     
-    async def _download_js(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
-        """Download JavaScript file"""
+    async def _fetch_and_scan(
+        self,
+        session: aiohttp.ClientSession,
+        js_url: str,
+        sem: asyncio.Semaphore,
+        max_bytes: int,
+        seen_endpoints: Set[str]
+    ) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+        """Download one JS file and extract its secrets, endpoints and source map"""
+        async with sem:
+            content = await self._download_js(session, js_url, max_bytes)
+            if not content:
+                return [], [], None
+            
+            secrets = self._find_secrets(content, js_url)
+            endpoints = self._find_endpoints(content, js_url, seen_endpoints)
+            source_map = await self._check_source_map(session, js_url, content)
+        
+        return secrets, endpoints, source_map
+    
+    async def _head_probe(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        sem: asyncio.Semaphore
+    ) -> Tuple[str, int, Optional[int]]:
+        """HEAD a URL, returning its status and advertised length"""
+        async with sem:
+            try:
+                async with session.head(url, allow_redirects=True, timeout=10) as resp:
+                    return url, resp.status, resp.content_length
+            except Exception as e:
+                logger.debug(f"HEAD failed for {url}: {e}")
+        
+        return url, 0, None
+    
+    async def _download_js(self, session: aiohttp.ClientSession, url: str,
+                           max_bytes: int) -> Optional[str]:
+        """Download JavaScript file, giving up on bodies larger than max_bytes"""
         try:
             async with session.get(url, timeout=30) as resp:
                 if resp.status == 200:
-                    content = await resp.text()
-                    # Check if it's actually JS
-                    if len(content) > 100 and ('function' in content or 'var' in content or 'const' in content):
-                        return content
+                    # Reject by headers before reading anything
+                    content_type = resp.headers.get("Content-Type", "").lower()
+                    if content_type and not any(t in content_type for t in self.JS_CONTENT_TYPES):
+                        logger.debug(f"Skipping {url}: content type {content_type}")
+                        return None
+                    if resp.content_length is not None and resp.content_length > max_bytes:
+                        logger.debug(f"Skipping {url}: larger than {max_bytes} bytes")
+                        return None
+                    
+                    body = bytearray()
+                    async for chunk in resp.content.iter_chunked(65536):
+                        body.extend(chunk)
+                        if len(body) > max_bytes:
+                            logger.debug(f"Skipping {url}: larger than {max_bytes} bytes")
+                            return None
+                    
+                    # Check if it's actually JS on the raw bytes, decoding only if so
+                    if len(body) > 100 and (b'function' in body or b'var' in body or b'const' in body):
+                        try:
+                            return body.decode(resp.charset or "utf-8", errors="replace")
+                        except LookupError:
+                            return body.decode("utf-8", errors="replace")
         except Exception as e:
             logger.debug(f"Failed to download {url}: {e}")
         
@@ -167,8 +293,27 @@ class JSAnalyzer:
         """Find secrets in JS content"""
         secrets = []
         
-        for secret_type, pattern in self.SECRET_PATTERNS.items():
-            matches = re.finditer(pattern, content, re.IGNORECASE)
+        lowered = content.lower()
+        
+        # Secret types whose required literals occur in the file
+        if self.SECRET_AUTOMATON is not None:
+            present = {
+                name
+                for _, names in self.SECRET_AUTOMATON.iter(lowered)
+                for name in names
+            }
+        else:
+            present = {
+                name for name, literals in self.SECRET_LITERALS.items()
+                if any(map(lowered.__contains__, literals))
+            }
+        
+        for secret_type, pattern in self.COMPILED_SECRETS.items():
+            # Skip the regex pass when a required literal is absent
+            if secret_type in self.SECRET_LITERALS and secret_type not in present:
+                continue
+            
+            matches = pattern.finditer(content)
             for match in matches:
                 # Get context around match
                 start = max(0, match.start() - 20)
@@ -185,29 +330,34 @@ class JSAnalyzer:
         
         return secrets
     
-    def _find_endpoints(self, content: str, source_url: str) -> List[Dict]:
-        """Find API endpoints in JS content"""
+    def _find_endpoints(self, content: str, source_url: str,
+                        seen: Set[str]) -> List[Dict]:
+        """Find API endpoints in JS content not already in seen"""
         endpoints = []
-        seen = set()
         
         base_domain = urlparse(source_url).netloc
         
-        for pattern in self.ENDPOINT_PATTERNS:
-            matches = re.finditer(pattern, content)
+        for pattern, literal in zip(self.COMPILED_ENDPOINTS, self.ENDPOINT_LITERALS):
+            if literal not in content:
+                continue
+            
+            matches = pattern.finditer(content)
             for match in matches:
                 # Get the captured group (the URL/path)
                 url = match.group(1) if match.groups() else match.group()
+                if not url:
+                    continue
                 
-                if url and url not in seen:
-                    seen.add(url)
-                    
-                    # Resolve relative URLs
-                    if url.startswith('/'):
-                        full_url = f"https://{base_domain}{url}"
-                    elif url.startswith('http'):
-                        full_url = url
-                    else:
-                        full_url = urljoin(source_url, url)
+                # Resolve relative URLs
+                if url.startswith('/'):
+                    full_url = f"https://{base_domain}{url}"
+                elif url.startswith('http'):
+                    full_url = url
+                else:
+                    full_url = urljoin(source_url, url)
+                
+                if full_url not in seen:
+                    seen.add(full_url)
                     
                     endpoints.append({
                         "url": full_url,
@@ -221,7 +371,7 @@ class JSAnalyzer:
                                js_url: str, content: str) -> Optional[str]:
         """Check for source map reference"""
         # Look for sourceMappingURL comment
-        match = re.search(r'//# sourceMappingURL=(.+)$', content, re.MULTILINE)
+        match = self.SOURCE_MAP_PATTERN.search(content)
         
         if match:
             map_url = match.group(1)
@@ -230,13 +380,20 @@ class JSAnalyzer:
             if not map_url.startswith('http'):
                 map_url = urljoin(js_url, map_url)
             
-            try:
-                async with session.get(map_url, timeout=30) as resp:
-                    if resp.status == 200:
-                        return map_url
-            except Exception:
-                pass
+            probe = self._source_map_probes.get(map_url)
+            if probe is None:
+                probe = asyncio.create_task(self._source_map_exists(session, map_url))
+                self._source_map_probes[map_url] = probe
+            
+            if await probe:
+                return map_url
         
         return None
-
-import uuid
+    
+    async def _source_map_exists(self, session: aiohttp.ClientSession, map_url: str) -> bool:
+        """HEAD the source map; its body is never needed here"""
+        try:
+            async with session.head(map_url, allow_redirects=True, timeout=30) as resp:
+                return resp.status == 200
+        except Exception:
+            return False
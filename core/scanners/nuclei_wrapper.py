@@ -3,12 +3,15 @@ Nuclei Scanner Wrapper
 Vulnerability scanning with Nuclei templates
 """
 
-import json
+import asyncio
 import logging
+import os
+import tempfile
 import uuid
 from typing import Dict, List, Any, Optional
 
 from api.database import DatabaseManager
+from core import fast_json
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 from api.llm_integration import LLMManager
@@ -18,6 +21,9 @@ logger = logging.getLogger(__name__)
 class NucleiScanner:
     """Nuclei vulnerability scanner integration"""
     
+    # Findings per LLM false-positive prompt
+    LLM_BATCH_SIZE = 16
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager,
                  llm_manager: Optional[LLMManager] = None):
         self.subprocess_mgr = subprocess_mgr
@@ -63,9 +69,6 @@ class NucleiScanner:
         rate_limit = config.get("rate_limit", 150)
         timeout = config.get("timeout", 30)
         
-        import tempfile
-        import os
-        
         # Write targets to file
         with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
             for target in targets:
@@ -73,6 +76,13 @@ class NucleiScanner:
             targets_file = f.name
         
         results = []
+        pending = []
+        batch = []
+        batch_size = config.get("llm_batch_size", self.LLM_BATCH_SIZE)
+        
+        # Bound concurrent LLM checks / DB inserts while nuclei keeps running
+        sem = asyncio.Semaphore(config.get("llm_concurrency", 8))
+        llm_filter = self.llm_manager is not None and config.get("llm_filter", True)
         
         try:
             cmd = (f"nuclei -l {targets_file} -severity {severity} "
@@ -85,64 +95,74 @@ class NucleiScanner:
             if config.get("exclude_tags"):
                 cmd += f" -exclude-tags {config['exclude_tags']}"
             
-            # Run with output parsing
-            stdout_lines = []
-            
-            def parse_output(line: str):
-                stdout_lines.append(line)
+            # Process each finding as soon as nuclei emits it
+            async for line in self.subprocess_mgr.run_stream(cmd, timeout=1800):  # 30 minutes max
+                if not line:
+                    continue
                 try:
-                    data = json.loads(line)
-                    results.append(self._parse_nuclei_result(data))
-                except json.JSONDecodeError:
-                    pass
-            
-            await self.subprocess_mgr.run(
-                cmd,
-                timeout=1800,  # 30 minutes max
-                stdout_callback=parse_output
-            )
-            
-            # Process results
-            verified_results = []
-            for result in results:
-                if not result:
+                    data = fast_json.loads(line)
+                except fast_json.JSONDecodeError:
                     continue
                 
-                # LLM-based false positive filtering
-                if self.llm_manager and config.get("llm_filter", True):
-                    is_fp = await self._check_false_positive(result)
-                    if is_fp:
-                        result["false_positive"] = True
-                        logger.debug(f"Filtered likely false positive: {result['name']}")
+                result = self._parse_nuclei_result(data)
+                results.append(result)
+                batch.append(result)
                 
-                # Save to database
-                await self.db.add_vulnerability(scan_id, {
+                if len(batch) >= batch_size:
+                    pending.append(asyncio.create_task(
+                        self._process_batch(batch, scan_id, sem, llm_filter)
+                    ))
+                    batch = []
+            
+            if batch:
+                pending.append(asyncio.create_task(
+                    self._process_batch(batch, scan_id, sem, llm_filter)
+                ))
+            
+        finally:
+            if pending:
+                outcomes = await asyncio.gather(*pending, return_exceptions=True)
+                for outcome in outcomes:
+                    if isinstance(outcome, Exception):
+                        logger.error(f"Failed to process Nuclei findings: {outcome}")
+            os.unlink(targets_file)
+        
+        verified_results = [r for r in results if not r.get("false_positive")]
+        
+        logger.info(f"Nuclei found {len(results)} issues, {len(verified_results)} after filtering")
+        
+        return {
+            "scanned": len(targets),
+            "findings": len(results),
+            "verified": len(verified_results),
+            "results": verified_results
+        }
+    
+    async def _process_batch(self, batch: List[Dict], scan_id: str,
+                             sem: asyncio.Semaphore, llm_filter: bool):
+        """Filter a batch of findings and save them to the database"""
+        async with sem:
+            # LLM-based false positive filtering, one prompt per batch
+            if llm_filter:
+                await self._check_false_positives(batch)
+            
+            # Save to database; DatabaseManager serializes concurrent batch writes
+            model = self.llm_manager.current_model if self.llm_manager else None
+            await self.db.add_vulnerabilities(scan_id, [
+                {
                     "title": result.get("name", "Unknown"),
                     "severity": result.get("severity", "info"),
                     "description": result.get("description", ""),
                     "affected_url": result.get("url", ""),
-                    "evidence": json.dumps(result.get("extracted_results", [])),
+                    "evidence": fast_json.dumps(result.get("extracted_results", [])),
                     "tool_source": "nuclei",
                     "template_id": result.get("template_id", ""),
                     "false_positive": result.get("false_positive", False),
                     "llm_analysis": result.get("llm_analysis", ""),
-                    "llm_model": self.llm_manager.current_model if self.llm_manager else None
-                })
-                
-                if not result.get("false_positive"):
-                    verified_results.append(result)
-            
-            logger.info(f"Nuclei found {len(results)} issues, {len(verified_results)} after filtering")
-            
-            return {
-                "scanned": len(targets),
-                "findings": len(results),
-                "verified": len(verified_results),
-                "results": verified_results
-            }
-            
-        finally:
-            os.unlink(targets_file)
+                    "llm_model": model
+                }
+                for result in batch
+            ])
     
     def _parse_nuclei_result(self, data: Dict) -> Dict:
         """Parse Nuclei JSON output"""
@@ -167,43 +187,62 @@ class NucleiScanner:
         except Exception as e:
             logger.error(f"Failed to update templates: {e}")
     
-    async def _check_false_positive(self, result: Dict) -> bool:
-        """Use LLM to check if result is likely false positive"""
+    async def _check_false_positives(self, batch: List[Dict]):
+        """Use LLM to flag likely false positives in a batch of results"""
         if not self.llm_manager:
-            return False
+            return
         
         try:
+            findings = "\n".join(
+                f"{i}. Template: {r.get('template_id')} | Name: {r.get('name')} | "
+                f"Severity: {r.get('severity')} | URL: {r.get('url')} | "
+                f"Evidence: {r.get('extracted_results', [])}"
+                for i, r in enumerate(batch)
+            )
+            
             prompt = f"""
-            Analyze this Nuclei finding for false positive likelihood:
+            Analyze these Nuclei findings for false positive likelihood:
             
-            Template: {result.get('template_id')}
-            Name: {result.get('name')}
-            Severity: {result.get('severity')}
-            URL: {result.get('url')}
-            Evidence: {result.get('extracted_results', [])}
+            {findings}
             
-            Is this likely a false positive? Consider:
+            For each finding, is it likely a false positive? Consider:
             1. Is the detection pattern specific enough?
             2. Could this be a default page or configuration?
             3. Is there actual security impact?
             
-            Respond with: YES (false positive), NO (valid finding), or MAYBE (needs manual review)
+            Respond with only a JSON array of objects {{"id": <number>, "verdict": "<YES|NO|MAYBE>", "reason": "<short reason>"}},
+            where YES = false positive, NO = valid finding, MAYBE = needs manual review
             """
             
             response = await self.llm_manager.generate(prompt, temperature=0.3)
             
-            if response:
-                response_upper = response.upper()
-                result["llm_analysis"] = response
+            if not response:
+                return
+            
+            # Handle cases where LLM wraps JSON in markdown
+            json_str = response
+            if "```json" in response:
+                json_str = response.split("```json")[1].split("```")[0]
+            elif "```" in response:
+                json_str = response.split("```")[1].split("```")[0]
+            
+            for item in fast_json.loads(json_str.strip()):
+                try:
+                    idx = int(item["id"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if not 0 <= idx < len(batch):
+                    continue
+                
+                result = batch[idx]
+                verdict = str(item.get("verdict", "")).upper()
+                result["llm_analysis"] = f"{verdict} - {item.get('reason', '')}"
                 
-                if "YES" in response_upper:
-                    return True
-                elif "MAYBE" in response_upper:
+                if verdict == "YES":
+                    result["false_positive"] = True
+                    logger.debug(f"Filtered likely false positive: {result['name']}")
+                elif verdict == "MAYBE":
                     result["severity"] = "info"  # Downgrade severity
             
-            return False
-            
         except Exception as e:
             logger.error(f"LLM false positive check failed: {e}")
-            return False
-
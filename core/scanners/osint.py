@@ -3,12 +3,18 @@ OSINT Gatherer
 Email harvesting, employee enumeration, social media discovery
 """
 
+import asyncio
 import logging
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import quote
 from typing import Dict, List, Any, Optional
 
 import aiohttp
 
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -17,6 +23,16 @@ logger = logging.getLogger(__name__)
 class OSINTGatherer:
     """Open Source Intelligence gathering"""
     
+    # Bytes of a profile page read for the "not found" check
+    PROFILE_READ_BYTES = 4096
+    # Matched against raw bytes; \xe2\x80\x99 is a UTF-8 right single quote
+    NOT_FOUND_PATTERN = re.compile(rb"not found|page doesn(?:'|\xe2\x80\x99)t exist", re.IGNORECASE)
+    REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)
+    
+    HIBP_URL = "https://haveibeenpwned.com/api/v3/breachedaccount"
+    # Seconds between HIBP requests to respect its rate limit
+    HIBP_RATE_DELAY = 1.5
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -31,12 +47,10 @@ class OSINTGatherer:
     ) -> Dict[str, Any]:
         """Gather OSINT data"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
-        
         results = {
             "emails": [],
             "employees": [],
@@ -60,7 +74,9 @@ class OSINTGatherer:
         
         # Breach checking
         if config.get("check_breaches", True):
-            results["breach_data"] = await self._check_breaches(results["emails"])
+            results["breach_data"] = await self._check_breaches(
+                results["emails"], config.get("hibp_api_key")
+            )
         
         logger.info(f"OSINT: {len(results['emails'])} emails, "
                    f"{len(results['employees'])} employees, "
@@ -93,23 +109,20 @@ class OSINTGatherer:
             await self.subprocess_mgr.run_simple(cmd, timeout=600)
             
             # Parse results
-            import xml.etree.ElementTree as ET
-            
             xml_file = f"/tmp/theharvester_{domain}.xml"
             results = {"emails": [], "employees": []}
             
             try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-                
-                for email in root.findall(".//email"):
-                    results["emails"].append(email.text)
-                
-                for host in root.findall(".//host"):
-                    # Extract potential employee names
-                    hostname = host.text
-                    if "@" in hostname:
-                        results["employees"].append(hostname.split("@")[0])
+                # Stream the report so large outputs never build a full tree
+                for _, elem in ET.iterparse(xml_file, events=("end",)):
+                    if elem.tag == "email":
+                        results["emails"].append(elem.text)
+                    elif elem.tag == "host":
+                        # Extract potential employee names
+                        hostname = elem.text
+                        if hostname and "@" in hostname:
+                            results["employees"].append(hostname.split("@")[0])
+                    elem.clear()
             
             except Exception as e:
                 logger.error(f"Failed to parse theHarvester output: {e}")
@@ -124,8 +137,6 @@ class OSINTGatherer:
         """Check for social media presence"""
         name = domain.replace(".", "")
         
-        profiles = []
-        
         # Check common platforms
         checks = [
             ("twitter", f"https://twitter.com/{name}"),
@@ -133,33 +144,76 @@ class OSINTGatherer:
             ("linkedin", f"https://linkedin.com/company/{name}"),
         ]
         
-        async with aiohttp.ClientSession() as session:
-            for platform, url in checks:
-                try:
-                    async with session.get(url, timeout=10, allow_redirects=True) as resp:
-                        if resp.status == 200:
-                            # Check if it's not a "not found" page
-                            text = await resp.text()
-                            if "not found" not in text.lower() and "page doesn't exist" not in text.lower():
-                                profiles.append({
-                                    "platform": platform,
-                                    "url": str(resp.url),
-                                    "exists": True
-                                })
-                except Exception:
-                    pass
-        
-        return profiles
+        session = await get_session()
+        results = await asyncio.gather(
+            *[self._check_profile(session, platform, url) for platform, url in checks],
+            return_exceptions=True
+        )
+        
+        return [r for r in results if r and not isinstance(r, Exception)]
     
-    async def _check_breaches(self, emails: List[str]) -> List[Dict]:
-        """Check emails against breach databases"""
-        breaches = []
+    async def _check_profile(self, session: aiohttp.ClientSession,
+                             platform: str, url: str) -> Optional[Dict]:
+        """Check a single social media profile URL"""
+        try:
+            # HEAD settles missing profiles (404 etc.) without transferring the page;
+            # a 200 is not proof, since some platforms serve soft-404 pages
+            async with session.head(url, timeout=self.REQUEST_TIMEOUT, allow_redirects=True) as resp:
+                if resp.status not in (200, 405):
+                    return None
+            
+            # Confirm with the head of the page (or GET when HEAD is not allowed)
+            headers = {"Range": f"bytes=0-{self.PROFILE_READ_BYTES - 1}"}
+            async with session.get(url, headers=headers, timeout=self.REQUEST_TIMEOUT,
+                                   allow_redirects=True) as resp:
+                if resp.status in (200, 206):
+                    # Check if it's not a "not found" page; the head of the page is enough
+                    head = await resp.content.read(self.PROFILE_READ_BYTES)
+                    if not self.NOT_FOUND_PATTERN.search(head):
+                        return {
+                            "platform": platform,
+                            "url": str(resp.url),
+                            "exists": True
+                        }
+        except Exception:
+            pass
         
-        # Use HaveIBeenPwned API (requires key)
-        # Limited implementation without API key
+        return None
+    
+    async def _check_breaches(self, emails: List[str],
+                              api_key: Optional[str] = None) -> List[Dict]:
+        """Check emails against HaveIBeenPwned (requires an API key)"""
+        if not api_key:
+            return []
         
-        for email in emails[:5]:  # Limit to first 5
-            # Placeholder - real implementation needs API key
-            pass
+        session = await get_session()
+        headers = {"hibp-api-key": api_key, "user-agent": "ReconX"}
+        
+        # HIBP is rate limited, so requests are serialized and spaced out
+        sem = asyncio.Semaphore(1)
+        
+        async def check_one(email: str) -> Optional[Dict]:
+            async with sem:
+                try:
+                    url = f"{self.HIBP_URL}/{quote(email)}"
+                    async with session.get(url, headers=headers, timeout=self.REQUEST_TIMEOUT) as resp:
+                        if resp.status == 200:
+                            data = fast_json.loads(await resp.read())
+                            return {
+                                "email": email,
+                                "breaches": [b.get("Name") for b in data]
+                            }
+                        if resp.status != 404:  # 404 means not breached
+                            logger.debug(f"HIBP returned {resp.status} for {email}")
+                except Exception as e:
+                    logger.debug(f"HIBP check failed for {email}: {e}")
+                finally:
+                    await asyncio.sleep(self.HIBP_RATE_DELAY)
+            
+            return None
+        
+        results = await asyncio.gather(
+            *[check_one(email) for email in emails[:5] if email]  # Limit to first 5
+        )
         
-        return breaches
+        return [r for r in results if r]
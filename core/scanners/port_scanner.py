@@ -3,11 +3,15 @@ Port Scanner
 Fast port scanning with naabu and nmap
 """
 
-import json
+import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from typing import Dict, List, Any, Optional, Set, Tuple
+from uuid import uuid4
 
 from api.database import DatabaseManager
+from core import fast_json
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -19,6 +23,20 @@ class PortScanner:
     TOP_PORTS = [80, 443, 8080, 8443, 3000, 8000, 8888, 9000, 5000, 7000,
                  22, 21, 23, 25, 53, 110, 143, 993, 995, 3306, 5432, 6379,
                  27017, 9200, 5601, 9090, 9092, 8081, 8082, 8083, 8880]
+    TOP_PORTS_STR = ",".join(map(str, TOP_PORTS))
+    
+    # Service names for well-known ports
+    _COMMON_PORTS = {
+        80: "http", 443: "https", 8080: "http-proxy", 8443: "https-alt",
+        22: "ssh", 21: "ftp", 23: "telnet", 25: "smtp", 53: "dns",
+        110: "pop3", 143: "imap", 993: "imaps", 995: "pop3s",
+        3306: "mysql", 5432: "postgresql", 6379: "redis",
+        27017: "mongodb", 9200: "elasticsearch", 5601: "kibana",
+        3000: "http", 5000: "http", 8000: "http", 9000: "http"
+    }
+    
+    # Concurrent naabu processes
+    MAX_PARALLEL_SCANS = 8
     
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
@@ -51,9 +69,9 @@ class PortScanner:
                 targets.add(ip)
         
         # Add root domain if available
-        target = await self.db.get_target(target_id)
-        if target:
-            targets.add(target["primary_domain"])
+        domain = await self.db.get_target_domain(target_id)
+        if domain:
+            targets.add(domain)
         
         if not targets:
             logger.warning("No targets for port scanning")
@@ -65,37 +83,48 @@ class PortScanner:
         scan_type = config.get("scan_type", "fast")  # fast, full, custom
         
         if scan_type == "fast":
-            ports = config.get("ports", ",".join(map(str, self.TOP_PORTS)))
+            ports = config.get("ports", self.TOP_PORTS_STR)
         elif scan_type == "full":
             ports = "1-65535"
         else:
-            ports = config.get("ports", ",".join(map(str, self.TOP_PORTS)))
+            ports = config.get("ports", self.TOP_PORTS_STR)
+        
+        # Use naabu for fast scanning, several targets at a time
+        await self.tool_manager.ensure_tool("naabu")
+        sem = asyncio.Semaphore(config.get("scan_parallelism", self.MAX_PARALLEL_SCANS))
+        
+        async def scan_one(target: str):
+            async with sem:
+                return target, await self._scan_naabu(target, ports)
+        
+        scanned = await asyncio.gather(*[scan_one(target) for target in targets])
         
-        # Use naabu for fast scanning
         total_open = 0
         
-        for target in targets:
-            open_ports = await self._scan_naabu(target, ports)
-            
+        for target, open_ports in scanned:
             if open_ports:
                 self.results[target] = open_ports
                 total_open += len(open_ports)
-                
-                # Save to database
-                for port_data in open_ports:
-                    await self.db._connection.execute("""
-                        INSERT INTO ports (id, scan_id, ip, port, protocol, service, state)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        str(uuid.uuid4()),
+        
+        # Save all open ports in one batch
+        if total_open:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
+                    INSERT INTO ports (id, scan_id, ip, port, protocol, service, state)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [
+                    (
+                        str(uuid4()),
                         scan_id,
                         target,
                         port_data["port"],
                         "tcp",
                         port_data.get("service", "unknown"),
                         "open"
-                    ))
-                await self.db._connection.commit()
+                    )
+                    for target, open_ports in self.results.items()
+                    for port_data in open_ports
+                ])
         
         # Service detection with nmap for top ports
         if config.get("service_detection", True) and total_open > 0:
@@ -115,20 +144,18 @@ class PortScanner:
         
         cmd = f"naabu -host {target} -port {ports} -silent -json"
         
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
-        
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=300):
             if not line:
                 continue
             try:
-                data = json.loads(line)
+                data = fast_json.loads(line)
                 results.append({
                     "port": data.get("port", 0),
                     "ip": data.get("ip", target),
                     "service": self._guess_service(data.get("port", 0))
                 })
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 # Parse plain text format
                 if ":" in line:
                     parts = line.split(":")
@@ -149,58 +176,77 @@ class PortScanner:
         """Run nmap service detection on open ports"""
         await self.tool_manager.ensure_tool("nmap")
         
-        # Limit to top 10 ports per host to save time
+        # Group hosts by port set (limited to top 10 ports per host to save
+        # time) so each group needs a single multi-host nmap run
+        groups: Dict[Tuple[int, ...], List[str]] = defaultdict(list)
         for ip, ports in port_results.items():
-            if len(ports) > 10:
-                ports = ports[:10]
-            
-            port_list = ",".join([str(p["port"]) for p in ports])
+            port_set = tuple(sorted({p["port"] for p in ports[:10]}))
+            groups[port_set].append(ip)
+        
+        updates = []
+        
+        for port_set, hosts in groups.items():
+            port_list = ",".join(map(str, port_set))
             
-            cmd = f"nmap -sV -p {port_list} --version-intensity 5 {ip} -oX -"
+            cmd = f"nmap -sV -p {port_list} --version-intensity 5 -oX - {' '.join(hosts)}"
             
             try:
-                stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
-                
-                # Parse XML output (simplified)
-                # Full implementation would use proper XML parsing
+                services = await self._run_nmap_services(cmd, set(hosts), timeout=300 * len(hosts))
                 
                 # Update database with service info
-                for port_data in ports:
-                    # Try to extract service from nmap output
-                    service = self._extract_service_from_nmap(stdout, port_data["port"])
-                    if service:
-                        await self.db._connection.execute("""
-                            UPDATE ports SET service = ? 
-                            WHERE scan_id = ? AND ip = ? AND port = ?
-                        """, (service, scan_id, ip, port_data["port"]))
-                        await self.db._connection.commit()
+                for (host, port), service in services.items():
+                    if port in port_set:
+                        updates.append((service, scan_id, host, port))
                         
             except Exception as e:
-                logger.error(f"nmap service detection failed for {ip}: {e}")
+                logger.error(f"nmap service detection failed for {', '.join(hosts)}: {e}")
+        
+        # Apply all service updates in one batch
+        if updates:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
+                    UPDATE ports SET service = ? 
+                    WHERE scan_id = ? AND ip = ? AND port = ?
+                """, updates)
     
-    def _guess_service(self, port: int) -> str:
-        """Guess service from common port numbers"""
-        common_ports = {
-            80: "http", 443: "https", 8080: "http-proxy", 8443: "https-alt",
-            22: "ssh", 21: "ftp", 23: "telnet", 25: "smtp", 53: "dns",
-            110: "pop3", 143: "imap", 993: "imaps", 995: "pop3s",
-            3306: "mysql", 5432: "postgresql", 6379: "redis",
-            27017: "mongodb", 9200: "elasticsearch", 5601: "kibana",
-            3000: "http", 5000: "http", 8000: "http", 9000: "http"
-        }
-        return common_ports.get(port, "unknown")
-    
-    def _extract_service_from_nmap(self, xml_output: str, port: int) -> Optional[str]:
-        """Extract service name from nmap XML output"""
-        import re
-        
-        # Simple regex extraction
-        pattern = rf'<port protocol="tcp" portid="{port}".*?<service name="([^"]*)"'
-        match = re.search(pattern, xml_output)
+    async def _run_nmap_services(self, cmd: str, targets: Set[str],
+                                 timeout: int) -> Dict[Tuple[str, int], str]:
+        """Run nmap and parse its XML as it streams, mapping (target, port) to service"""
+        parser = ET.XMLPullParser(events=("end",))
+        services = {}
+        
+        def collect():
+            for _, elem in parser.read_events():
+                if elem.tag != "host":
+                    continue
+                
+                # Match the host back to the target we passed (IP or user-supplied hostname)
+                names = {a.get("addr") for a in elem.iter("address")}
+                names.update(h.get("name") for h in elem.iter("hostname") if h.get("type") == "user")
+                target = next((n for n in names if n in targets), None)
+                
+                if target:
+                    for port, service in self._parse_nmap_services(elem).items():
+                        services[(target, port)] = service
+                
+                elem.clear()
         
-        if match:
-            return match.group(1)
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=timeout):
+            parser.feed(line + "\n")
+            collect()
         
-        return None
-
-import uuid
+        return services
+    
+    @staticmethod
+    def _parse_nmap_services(host: ET.Element) -> Dict[int, str]:
+        """Map each TCP port of an nmap <host> element to its detected service"""
+        services = {}
+        for port in host.iter("port"):
+            service = port.find("service")
+            if port.get("protocol") == "tcp" and service is not None and service.get("name"):
+                services[int(port.get("portid"))] = service.get("name")
+        return services
+    
+    def _guess_service(self, port: int) -> str:
+        """Guess service from common port numbers"""
+        return self._COMMON_PORTS.get(port, "unknown")
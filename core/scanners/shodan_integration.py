@@ -3,19 +3,41 @@ Shodan Integration Scanner
 Shodan API for host information
 """
 
+import asyncio
 import logging
+import os
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
 import aiohttp
 
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 
 logger = logging.getLogger(__name__)
 
+SETTINGS_PATH = 'config/settings.json'
+
+@lru_cache(maxsize=1)
+def _read_settings(mtime_ns: int) -> Dict:
+    """Parse the settings file; cached per modification time"""
+    with open(SETTINGS_PATH, 'rb') as f:
+        return fast_json.loads(f.read())
+
+def _load_settings() -> Dict:
+    """Load settings once per process, re-reading only if the file changed"""
+    try:
+        return _read_settings(os.stat(SETTINGS_PATH).st_mtime_ns)
+    except Exception:
+        return {}
+
 class ShodanIntegration:
     """Shodan API integration"""
     
+    MAX_CONCURRENT_QUERIES = 8
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -24,13 +46,7 @@ class ShodanIntegration:
     
     def _load_api_key(self):
         """Load Shodan API key from config"""
-        try:
-            import json
-            with open('config/settings.json') as f:
-                config = json.load(f)
-                self.api_key = config.get('shodan_api_key')
-        except Exception:
-            pass
+        self.api_key = _load_settings().get('shodan_api_key')
     
     async def scan(
         self,
@@ -49,24 +65,40 @@ class ShodanIntegration:
         dns_data = previous_results.get("dns_resolution", {})
         resolutions = dns_data.get("resolutions", {})
         
+        # Flatten to the IPs to query
+        ips = [
+            ip
+            for subdomain, host_ips in list(resolutions.items())[:5]  # Limit to 5 hosts
+            for ip in host_ips[:2]  # Limit to 2 IPs per host
+        ]
+        
+        # Query concurrently, capped to stay within Shodan's rate limit
+        session = await get_session()
+        sem = asyncio.Semaphore(config.get("shodan_concurrency", self.MAX_CONCURRENT_QUERIES))
+        
+        async def bounded_query(ip: str) -> Optional[Dict]:
+            async with sem:
+                return await self._query_host(session, ip)
+        
+        results = await asyncio.gather(*[bounded_query(ip) for ip in ips])
+        
         all_results = []
+        vulns = []
+        for ip, result in zip(ips, results):
+            if result:
+                all_results.append(result)
+                
+                # Add vulnerabilities from Shodan
+                for vuln in result.get("vulns", []):
+                    vulns.append({
+                        "title": f"Shodan: {vuln}",
+                        "severity": "high",
+                        "description": f"Vulnerability detected by Shodan for {ip}",
+                        "affected_url": f"http://{ip}",
+                        "tool_source": "shodan"
+                    })
         
-        async with aiohttp.ClientSession() as session:
-            for subdomain, ips in list(resolutions.items())[:5]:  # Limit to 5 hosts
-                for ip in ips[:2]:  # Limit to 2 IPs per host
-                    result = await self._query_host(session, ip)
-                    if result:
-                        all_results.append(result)
-                        
-                        # Add vulnerabilities from Shodan
-                        for vuln in result.get("vulns", []):
-                            await self.db.add_vulnerability(scan_id, {
-                                "title": f"Shodan: {vuln}",
-                                "severity": "high",
-                                "description": f"Vulnerability detected by Shodan for {ip}",
-                                "affected_url": f"http://{ip}",
-                                "tool_source": "shodan"
-                            })
+        await self.db.add_vulnerabilities(scan_id, vulns)
         
         return {
             "hosts_queried": len(all_results),
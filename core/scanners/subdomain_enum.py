@@ -4,12 +4,26 @@ Integrates subfinder, amass, assetfinder, findomain, crt.sh
 """
 
 import asyncio
-import json
+import itertools
 import logging
-from typing import Dict, List, Set, Any, Optional
-from dataclasses import dataclass
+import os
+import tempfile
+from typing import Dict, Iterable, List, Set, Any, Optional
+from dataclasses import dataclass, field
+
+try:
+    import ijson
+except ImportError:  # Optional: streams large crt.sh responses
+    ijson = None
+
+try:
+    import aiodns
+except ImportError:  # Optional: in-process DNS for brute force/permutations
+    aiodns = None
 
 from api.database import DatabaseManager
+from core import fast_json
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -18,19 +32,22 @@ logger = logging.getLogger(__name__)
 @dataclass
 class SubdomainResult:
     subdomain: str
-    sources: List[str]
+    sources: Set[str] = field(default_factory=set)
     ip_addresses: List[str] = None
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             "subdomain": self.subdomain,
-            "sources": self.sources,
+            "sources": sorted(self.sources),
             "ip_addresses": self.ip_addresses or []
         }
 
 class SubdomainEnumerator:
     """Multi-source subdomain enumeration"""
     
+    # Concurrent in-process DNS queries when verifying candidates
+    DNS_CONCURRENCY = 200
+    
     def __init__(self, subprocess_mgr: SubprocessManager, db: DatabaseManager):
         self.subprocess_mgr = subprocess_mgr
         self.db = db
@@ -46,11 +63,10 @@ class SubdomainEnumerator:
     ) -> Dict[str, Any]:
         """Run subdomain enumeration"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
         logger.info(f"Starting subdomain enumeration for {domain}")
         
         # Passive enumeration tasks
@@ -74,7 +90,8 @@ class SubdomainEnumerator:
         # Run all passive sources concurrently
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Aggregate results
+        # Aggregate results, keeping only names under the target domain
+        suffix = "." + domain
         for result in results:
             if isinstance(result, Exception):
                 logger.error(f"Subdomain tool failed: {result}")
@@ -84,13 +101,15 @@ class SubdomainEnumerator:
                 subdomain = subdomain_data["subdomain"]
                 source = subdomain_data["source"]
                 
+                if subdomain != domain and not subdomain.endswith(suffix):
+                    continue
+                
                 if subdomain in self.results:
-                    if source not in self.results[subdomain].sources:
-                        self.results[subdomain].sources.append(source)
+                    self.results[subdomain].sources.add(source)
                 else:
                     self.results[subdomain] = SubdomainResult(
                         subdomain=subdomain,
-                        sources=[source]
+                        sources={source}
                     )
         
         # Brute force if enabled
@@ -116,21 +135,19 @@ class SubdomainEnumerator:
         """Run subfinder"""
         await self.tool_manager.ensure_tool("subfinder")
         
-        cmd = f"subfinder -d {domain} -all -silent -json"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
+        cmd = ["subfinder", "-d", domain, "-all", "-silent", "-json"]
         
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=300):
             if not line:
                 continue
             try:
-                data = json.loads(line)
+                data = fast_json.loads(line)
                 results.append({
                     "subdomain": data.get("host", ""),
                     "source": "subfinder"
                 })
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 # Fallback to plain text parsing
                 if line and not line.startswith('['):
                     results.append({"subdomain": line.strip(), "source": "subfinder"})
@@ -142,20 +159,18 @@ class SubdomainEnumerator:
         """Run amass (passive mode)"""
         await self.tool_manager.ensure_tool("amass")
         
-        cmd = f"amass enum -passive -d {domain} -json"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=600)
+        cmd = ["amass", "enum", "-passive", "-d", domain, "-json"]
         
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=600):
             if not line:
                 continue
             try:
-                data = json.loads(line)
+                data = fast_json.loads(line)
                 name = data.get("name", "")
                 if name:
                     results.append({"subdomain": name, "source": "amass"})
-            except json.JSONDecodeError:
+            except fast_json.JSONDecodeError:
                 pass
         
         logger.info(f"amass found {len(results)} subdomains")
@@ -165,14 +180,14 @@ class SubdomainEnumerator:
         """Run assetfinder"""
         await self.tool_manager.ensure_tool("assetfinder")
         
-        cmd = f"assetfinder --subs-only {domain}"
+        cmd = ["assetfinder", "--subs-only", domain]
         
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=180)
+        suffix = "." + domain
         
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=180):
             subdomain = line.strip()
-            if subdomain and domain in subdomain:
+            if subdomain == domain or subdomain.endswith(suffix):
                 results.append({"subdomain": subdomain, "source": "assetfinder"})
         
         logger.info(f"assetfinder found {len(results)} subdomains")
@@ -182,12 +197,10 @@ class SubdomainEnumerator:
         """Run findomain"""
         await self.tool_manager.ensure_tool("findomain")
         
-        cmd = f"findomain -t {domain} -q"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=180)
+        cmd = ["findomain", "-t", domain, "-q"]
         
         results = []
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=180):
             subdomain = line.strip()
             if subdomain:
                 results.append({"subdomain": subdomain, "source": "findomain"})
@@ -197,29 +210,38 @@ class SubdomainEnumerator:
     
     async def _run_crtsh(self, domain: str) -> List[Dict]:
         """Query crt.sh certificate transparency logs"""
-        import aiohttp
-        
         results = []
         
         try:
-            async with aiohttp.ClientSession() as session:
-                url = f"https://crt.sh/?q=%.{domain}&output=json"
-                
-                async with session.get(url, timeout=60) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        
-                        seen = set()
-                        for entry in data:
-                            name = entry.get("name_value", "")
-                            for sub in name.split('\n'):
-                                sub = sub.strip()
-                                if sub and sub not in seen and domain in sub:
-                                    seen.add(sub)
-                                    results.append({
-                                        "subdomain": sub,
-                                        "source": "crt.sh"
-                                    })
+            session = await get_session()
+            url = f"https://crt.sh/?q=%.{domain}&output=json"
+            
+            domain = domain.lower()
+            suffix = "." + domain
+            seen = set()
+            
+            async with session.get(url, timeout=60) as resp:
+                if resp.status == 200:
+                    if ijson is not None:
+                        # Parse entries as they arrive, keeping only name_value
+                        names: List[str] = []
+                        async for entry in ijson.items(resp.content, "item"):
+                            names.extend(entry.get("name_value", "").split('\n'))
+                    else:
+                        names = (
+                            name
+                            for entry in fast_json.loads(await resp.read())
+                            for name in entry.get("name_value", "").split('\n')
+                        )
+                    
+                    for sub in names:
+                        sub = sub.strip().lower()
+                        if sub not in seen and (sub == domain or sub.endswith(suffix)):
+                            seen.add(sub)
+                            results.append({
+                                "subdomain": sub,
+                                "source": "crt.sh"
+                            })
             
             logger.info(f"crt.sh found {len(results)} subdomains")
             
@@ -239,27 +261,15 @@ class SubdomainEnumerator:
             logger.warning(f"Wordlist {wordlist_name} not found")
             return
         
-        await self.tool_manager.ensure_tool("dnsx")
-        
-        cmd = f"dnsx -d {domain} -w {wordlist_path} -silent -json"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=600)
+        if aiodns is not None:
+            with open(wordlist_path) as f:
+                words = (word.strip() for word in f)
+                found = await self._resolve_live(f"{word}.{domain}" for word in words if word)
+        else:
+            cmd = ["dnsx", "-d", domain, "-w", str(wordlist_path), "-silent", "-json"]
+            found = await self._dnsx_live(cmd, timeout=600)
         
-        count = 0
-        for line in stdout.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                data = json.loads(line)
-                subdomain = data.get("host", "")
-                if subdomain and subdomain not in self.results:
-                    self.results[subdomain] = SubdomainResult(
-                        subdomain=subdomain,
-                        sources=["brute-force"]
-                    )
-                    count += 1
-            except json.JSONDecodeError:
-                pass
+        count = self._add_new(found, "brute-force")
         
         logger.info(f"Brute force found {count} new subdomains")
     
@@ -268,58 +278,93 @@ class SubdomainEnumerator:
         prefixes = ["dev", "staging", "test", "api", "admin", "portal", "app", "web"]
         suffixes = ["dev", "staging", "test", "prod", "1", "2", "old", "new"]
         
-        permutations = set()
-        base_subdomains = [s for s in self.results.keys() if s != domain]
+        # Leftmost label under the domain for each known subdomain
+        dom_suffix = f".{domain}"
+        bases = {
+            sub[:-len(dom_suffix)].rsplit('.', 1)[-1]
+            for sub in self.results
+            if sub.endswith(dom_suffix)
+        }
         
-        for sub in base_subdomains:
-            parts = sub.replace(f".{domain}", "").split('.')
-            base = parts[-1]
-            
-            for prefix in prefixes:
-                permutations.add(f"{prefix}-{base}.{domain}")
-                permutations.add(f"{prefix}{base}.{domain}")
-            
-            for suffix in suffixes:
-                permutations.add(f"{base}-{suffix}.{domain}")
-                permutations.add(f"{base}{suffix}.{domain}")
+        permutations = {
+            f"{left}{sep}{right}{dom_suffix}"
+            for left, right in itertools.chain(
+                itertools.product(prefixes, bases),
+                itertools.product(bases, suffixes)
+            )
+            for sep in ("-", "")
+        }
         
         # Check which permutations resolve
         if permutations:
-            await self.tool_manager.ensure_tool("dnsx")
-            
-            # Write permutations to temp file
-            import tempfile
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-                for perm in permutations:
-                    f.write(perm + '\n')
-                temp_file = f.name
-            
-            cmd = f"dnsx -l {temp_file} -silent -json"
-            stdout = await self.subprocess_mgr.run_simple(cmd, timeout=120)
-            
-            count = 0
-            for line in stdout.strip().split('\n'):
-                if not line:
-                    continue
+            if aiodns is not None:
+                found = await self._resolve_live(permutations)
+            else:
+                # Write permutations to temp file
+                with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+                    for perm in permutations:
+                        f.write(perm + '\n')
+                    temp_file = f.name
+                
                 try:
-                    data = json.loads(line)
-                    subdomain = data.get("host", "")
-                    if subdomain and subdomain not in self.results:
-                        self.results[subdomain] = SubdomainResult(
-                            subdomain=subdomain,
-                            sources=["permutation"]
-                        )
-                        count += 1
-                except json.JSONDecodeError:
-                    pass
+                    cmd = ["dnsx", "-l", temp_file, "-silent", "-json"]
+                    found = await self._dnsx_live(cmd, timeout=120)
+                finally:
+                    os.unlink(temp_file)
             
-            # Cleanup temp file
-            import os
-            os.unlink(temp_file)
+            count = self._add_new(found, "permutation")
             
             logger.info(f"Permutations found {count} new subdomains")
     
+    async def _resolve_live(self, names: Iterable[str]) -> List[str]:
+        """Return the names that have an A record, querying in-process"""
+        resolver = aiodns.DNSResolver()
+        names = iter(names)
+        found = []
+        
+        # Fixed pool of workers pulling from one iterator, so large wordlists
+        # are never materialized
+        async def worker():
+            for name in names:
+                try:
+                    await resolver.query(name, "A")
+                except aiodns.error.DNSError:
+                    continue
+                found.append(name)
+        
+        await asyncio.gather(*[worker() for _ in range(self.DNS_CONCURRENCY)])
+        return found
+    
+    async def _dnsx_live(self, cmd: List[str], timeout: int) -> List[str]:
+        """Run dnsx and return the hosts it resolved"""
+        await self.tool_manager.ensure_tool("dnsx")
+        
+        found = []
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=timeout):
+            if not line:
+                continue
+            try:
+                data = fast_json.loads(line)
+                subdomain = data.get("host", "")
+                if subdomain:
+                    found.append(subdomain)
+            except fast_json.JSONDecodeError:
+                pass
+        
+        return found
+    
+    def _add_new(self, subdomains: Iterable[str], source: str) -> int:
+        """Record subdomains not already known, returning how many were new"""
+        count = 0
+        for subdomain in subdomains:
+            if subdomain not in self.results:
+                self.results[subdomain] = SubdomainResult(
+                    subdomain=subdomain,
+                    sources={source}
+                )
+                count += 1
+        return count
+    
     async def _save_results(self, scan_id: str):
         """Save results to database"""
-        for result in self.results.values():
-            await self.db.add_subdomain(scan_id, result.to_dict())
+        await self.db.add_subdomains(scan_id, [r.to_dict() for r in self.results.values()])
@@ -5,10 +5,11 @@ Historical URL discovery and analysis
 
 import logging
 from typing import Dict, List, Any, Optional, Set
-
-import aiohttp
+from urllib.parse import urlparse, parse_qs
+from uuid import uuid4
 
 from api.database import DatabaseManager
+from core.http_client import get_session
 from core.subprocess_manager import SubprocessManager
 from core.tool_manager import ToolManager
 
@@ -31,12 +32,10 @@ class WaybackMachine:
     ) -> Dict[str, Any]:
         """Discover historical URLs"""
         
-        target = await self.db.get_target(target_id)
-        if not target:
+        domain = await self.db.get_target_domain(target_id)
+        if not domain:
             raise ValueError(f"Target {target_id} not found")
         
-        domain = target["primary_domain"]
-        
         urls = set()
         
         # Use gau
@@ -60,19 +59,16 @@ class WaybackMachine:
         # Extract parameters for fuzzing
         parameters = self._extract_parameters(urls)
         
-        # Save to database
-        for url in list(urls)[:1000]:  # Limit to 1000
-            await self.db._connection.execute("""
-                INSERT INTO endpoints (id, scan_id, url, method, discovered_via)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                str(__import__('uuid').uuid4()),
-                scan_id,
-                url,
-                "GET",
-                "wayback"
-            ))
-        await self.db._connection.commit()
+        # Save to database in one batch
+        if urls:
+            async with self.db.transaction() as conn:
+                await conn.executemany("""
+                    INSERT INTO endpoints (id, scan_id, url, method, discovered_via)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [
+                    (str(uuid4()), scan_id, url, "GET", "wayback")
+                    for url in list(urls)[:1000]  # Limit to 1000
+                ])
         
         logger.info(f"Wayback: {len(urls)} URLs, {len(parameters)} unique parameters")
         
@@ -89,10 +85,8 @@ class WaybackMachine:
         
         cmd = f"gau {domain} --subs --threads 5"
         
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
-        
         urls = set()
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=300):
             url = line.strip()
             if url and url.startswith('http'):
                 urls.add(url)
@@ -103,12 +97,11 @@ class WaybackMachine:
         """Run waybackurls"""
         await self.tool_manager.ensure_tool("waybackurls")
         
-        cmd = f"echo {domain} | waybackurls"
-        
-        stdout = await self.subprocess_mgr.run_simple(cmd, timeout=300)
+        # Domain goes in on stdin; commands are exec'd, not run through a shell
+        cmd = "waybackurls"
         
         urls = set()
-        for line in stdout.strip().split('\n'):
+        async for line in self.subprocess_mgr.run_stream(cmd, timeout=300, input_data=domain):
             url = line.strip()
             if url and url.startswith('http'):
                 urls.add(url)
@@ -121,17 +114,17 @@ class WaybackMachine:
         
         urls = set()
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(url, timeout=120) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        # Skip header row
-                        for entry in data[1:]:
-                            if entry:
-                                urls.add(entry[0])
-            except Exception as e:
-                logger.error(f"Wayback API query failed: {e}")
+        session = await get_session()
+        try:
+            async with session.get(url, timeout=120) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    # Skip header row
+                    for entry in data[1:]:
+                        if entry:
+                            urls.add(entry[0])
+        except Exception as e:
+            logger.error(f"Wayback API query failed: {e}")
         
         return urls
     
@@ -159,8 +152,6 @@ class WaybackMachine:
     
     def _extract_parameters(self, urls: Set[str]) -> Set[str]:
         """Extract unique parameter names from URLs"""
-        from urllib.parse import urlparse, parse_qs
-        
         parameters = set()
         
         for url in urls:
@@ -172,5 +163,3 @@ class WaybackMachine:
                 pass
         
         return parameters
-
-import uuid
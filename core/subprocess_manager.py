@@ -7,7 +7,7 @@ import asyncio
 import logging
 import shlex
 from dataclasses import dataclass
-from typing import Optional, Callable, List, Dict, Any
+from typing import Optional, Callable, List, Dict, Any, AsyncIterator, Union
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -30,15 +30,16 @@ class SubprocessManager:
     
     async def run(
         self,
-        command: str,
+        command: Union[str, List[str]],
         timeout: int = 300,
         cwd: Optional[str] = None,
         env: Optional[Dict[str, str]] = None,
         stdout_callback: Optional[Callable[[str], None]] = None,
         stderr_callback: Optional[Callable[[str], None]] = None,
-        task_id: Optional[str] = None
+        task_id: Optional[str] = None,
+        input_data: Optional[str] = None
     ) -> ProcessResult:
-        """Run command with timeout and streaming output"""
+        """Run command with timeout and streaming output; a list is used as argv as-is"""
         
         start_time = datetime.utcnow()
         
@@ -53,6 +54,7 @@ class SubprocessManager:
         try:
             proc = await asyncio.create_subprocess_exec(
                 *cmd_parts,
+                stdin=asyncio.subprocess.PIPE if input_data is not None else None,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
@@ -83,10 +85,22 @@ class SubprocessManager:
                     while self._paused and not self._stopped:
                         await asyncio.sleep(0.1)
             
+            async def feed_stdin():
+                if input_data is None:
+                    return
+                try:
+                    proc.stdin.write(input_data.encode('utf-8'))
+                    await proc.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    proc.stdin.close()
+            
             # Wait for completion with timeout
             try:
                 await asyncio.wait_for(
                     asyncio.gather(
+                        feed_stdin(),
                         read_stream(proc.stdout, stdout_callback, stdout_lines),
                         read_stream(proc.stderr, stderr_callback, stderr_lines)
                     ),
@@ -107,7 +121,7 @@ class SubprocessManager:
                 stdout='\n'.join(stdout_lines),
                 stderr='\n'.join(stderr_lines),
                 duration=duration,
-                command=command
+                command=command if isinstance(command, str) else shlex.join(command)
             )
             
         except Exception as e:
@@ -117,13 +131,90 @@ class SubprocessManager:
             if task_id and task_id in self.active_processes:
                 del self.active_processes[task_id]
     
-    async def run_simple(self, command: str, timeout: int = 60) -> str:
+    async def run_simple(self, command: Union[str, List[str]], timeout: int = 60,
+                         input_data: Optional[str] = None) -> str:
         """Simple execution returning stdout only"""
-        result = await self.run(command, timeout=timeout)
+        result = await self.run(command, timeout=timeout, input_data=input_data)
         if result.returncode != 0:
             logger.warning(f"Command failed with code {result.returncode}: {result.stderr}")
         return result.stdout
     
+    async def run_stream(self, command: Union[str, List[str]], timeout: int = 300,
+                         input_data: Optional[str] = None) -> AsyncIterator[str]:
+        """Run command and yield stdout lines as they are produced"""
+        if isinstance(command, str):
+            cmd_parts = shlex.split(command)
+        else:
+            cmd_parts = command
+        
+        logger.debug(f"Streaming: {' '.join(cmd_parts)}")
+        
+        proc = await asyncio.create_subprocess_exec(
+            *cmd_parts,
+            stdin=asyncio.subprocess.PIPE if input_data is not None else None,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        
+        async def feed_stdin():
+            try:
+                proc.stdin.write(input_data.encode('utf-8'))
+                await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+        
+        # Drain stdin/stderr in the background so the pipes never fill up
+        helpers = [asyncio.create_task(proc.stderr.read())]
+        if input_data is not None:
+            helpers.append(asyncio.create_task(feed_stdin()))
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        finished = False
+        
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(
+                        proc.stdout.readline(),
+                        timeout=max(0.0, deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    logger.warning(f"Command timed out after {timeout}s: {command}")
+                    break
+                if not line:
+                    finished = True
+                    break
+                
+                yield line.decode('utf-8', errors='replace').rstrip()
+                
+                # Check for pause/stop
+                if self._stopped:
+                    break
+                while self._paused and not self._stopped:
+                    await asyncio.sleep(0.1)
+        finally:
+            if not finished and proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+            returncode = await proc.wait()
+            
+            stderr = b""
+            if finished and returncode != 0:
+                done, _ = await asyncio.wait(helpers[:1], timeout=1)
+                if done:
+                    stderr = helpers[0].result()
+                logger.warning(
+                    f"Command failed with code {returncode}: "
+                    f"{stderr.decode('utf-8', errors='replace').strip()}"
+                )
+            for helper in helpers:
+                helper.cancel()
+    
     def pause_all(self):
         """Pause all active processes"""
         self._paused = True
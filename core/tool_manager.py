@@ -7,7 +7,7 @@ import json
 import logging
 import shutil
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from core.subprocess_manager import SubprocessManager
 
@@ -16,11 +16,13 @@ logger = logging.getLogger(__name__)
 class ToolManager:
     """Manage security tool installation and updates"""
     
+    # Tools known to be available, shared by every instance in the process
+    _ready: Set[str] = set()
+    
     def __init__(self, config_path: str = "config/tools.json"):
         self.config_path = Path(config_path)
         self.tools_config = self._load_config()
         self.subprocess_mgr = SubprocessManager()
-        self.installed_tools: Dict[str, bool] = {}
     
     def _load_config(self) -> Dict:
         """Load tools configuration"""
@@ -87,7 +89,7 @@ class ToolManager:
             success = result.returncode == 0
             if success:
                 logger.info(f"Successfully installed {tool_name}")
-                self.installed_tools[tool_name] = True
+                ToolManager._ready.add(tool_name)
             else:
                 logger.error(f"Failed to install {tool_name}: {result.stderr}")
             
@@ -99,19 +101,27 @@ class ToolManager:
     
     async def ensure_tool(self, tool_name: str) -> bool:
         """Ensure tool is installed, install if missing"""
-        if tool_name in self.installed_tools:
-            return self.installed_tools[tool_name]
-        
-        is_installed, version = self.check_tool(tool_name)
+        if tool_name in ToolManager._ready:
+            return True
         
-        if is_installed:
-            logger.debug(f"{tool_name} is already installed: {version}")
-            self.installed_tools[tool_name] = True
+        # Only presence matters here; skip check_tool's version subprocess
+        tool_config = self.tools_config.get("tools", {}).get(tool_name)
+        if tool_config and shutil.which(self._resolve_path(tool_config.get("binary_path", tool_name))):
+            logger.debug(f"{tool_name} is already installed")
+            ToolManager._ready.add(tool_name)
             return True
         
         logger.info(f"{tool_name} not found, attempting installation...")
         return await self.install_tool(tool_name)
     
+    @classmethod
+    def invalidate(cls, tool_name: Optional[str] = None):
+        """Forget cached availability for one tool, or all tools"""
+        if tool_name is None:
+            cls._ready.clear()
+        else:
+            cls._ready.discard(tool_name)
+    
     async def install_all(self, category: Optional[str] = None) -> Dict[str, bool]:
         """Install all tools or tools in category"""
         tools = self.tools_config.get("tools", {})
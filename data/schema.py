@@ -169,8 +169,8 @@ CREATE TABLE IF NOT EXISTS continuous_monitors (
     interval_hours INTEGER DEFAULT 24,
     enabled_modules TEXT,
     alert_on_changes BOOLEAN DEFAULT 1,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    last_run TIMESTAMP,
+    created_at INTEGER DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+    last_run INTEGER,
     FOREIGN KEY (target_id) REFERENCES targets(id) ON DELETE CASCADE
 );
 
@@ -185,6 +185,16 @@ CREATE TABLE IF NOT EXISTS notifications (
     delivered BOOLEAN DEFAULT 0
 );
 
+-- Certificate transparency response cache
+CREATE TABLE IF NOT EXISTS ct_cache (
+    domain TEXT NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at INTEGER NOT NULL,
+    certificates INTEGER DEFAULT 0,
+    names TEXT DEFAULT '[]',
+    PRIMARY KEY (domain, source)
+);
+
 -- Scan logs
 CREATE TABLE IF NOT EXISTS scan_logs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -11,6 +11,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from core.subprocess_manager import SubprocessManager
+from core.tool_manager import ToolManager
 
 logger = logging.getLogger(__name__)
 
@@ -127,6 +128,7 @@ class ToolInstaller:
     async def update_tool(self, tool_name: str) -> Tuple[bool, str]:
         """Update a tool to latest version"""
         # Most Go tools update via reinstall
+        ToolManager.invalidate(tool_name)
         return await self.install_tool(tool_name)
     
     def get_install_status(self) -> List[Dict]: